@@ -1,57 +1,24 @@
 import streamlit as st
-import requests
 from PIL import Image
 import io
 import os
 import json
-from dotenv import load_dotenv
 from fpdf import FPDF
-import base64
 import random
-
-# Load API keys
-load_dotenv()
-CLARIFAI_API_KEY = os.getenv("CLARIFAI_API_KEY")
-SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")
+from clarifai import ClarifaiError, detect_ingredients
+from spoonacular import SpoonacularError, find_by_ingredients, get_recipes_information
 
 st.set_page_config(page_title="AI Recipe Generator", layout="centered")
 st.title("🍲 Ingredient Image to Recipe Generator")
 
 uploaded_file = st.file_uploader("Upload an ingredient image", type=["jpg", "jpeg", "png"])
 
-def clarifai_predict(image_base64):
-    url = "https://api.clarifai.com/v2/models/food-item-recognition/outputs"
-    headers = {
-        "Authorization": f"Key {CLARIFAI_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "inputs": [
-            {
-                "data": {
-                    "image": {
-                        "base64": image_base64
-                    }
-                }
-            }
-        ]
-    }
-    response = requests.post(url, headers=headers, json=data)
-    if response.status_code != 200:
-        st.error(f"Clarifai API error: {response.status_code} {response.text}")
+def clarifai_predict(image_bytes):
+    try:
+        return detect_ingredients(image_bytes)
+    except ClarifaiError as e:
+        st.error(str(e))
         return []
-    outputs = response.json()["outputs"][0]["data"].get("concepts", [])
-    return [concept['name'] for concept in outputs if concept['value'] > 0.85]
-
-def get_recipe_information(recipe_id):
-    url = f"https://api.spoonacular.com/recipes/{recipe_id}/information"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY
-    }
-    res = requests.get(url, params=params)
-    if res.status_code == 200:
-        return res.json()
-    return None
 
 def create_recipe_pdf(recipe):
     pdf = FPDF()
@@ -107,29 +74,25 @@ if uploaded_file:
     buffered = io.BytesIO()
     image.save(buffered, format="JPEG")
     img_bytes = buffered.getvalue()
-    img_base64 = base64.b64encode(img_bytes).decode('utf-8')
 
     with st.spinner("🔍 Detecting ingredients using Clarifai..."):
-        ingredients = clarifai_predict(img_base64)
+        ingredients = clarifai_predict(img_bytes)
 
     if ingredients:
         st.success("✅ Ingredients detected!")
         st.write(", ".join(ingredients))
 
         with st.spinner("📡 Fetching recipes..."):
-            params = {
-                "apiKey": SPOONACULAR_API_KEY,
-                "ingredients": ",".join(ingredients),
-                "number": 3,
-                "ranking": 1
-            }
-            res = requests.get("https://api.spoonacular.com/recipes/findByIngredients", params=params)
-
-            if res.status_code == 200:
-                recipes = res.json()
+            try:
+                recipes = find_by_ingredients(ingredients, number=3, ranking=1)
+            except SpoonacularError as e:
+                st.error(f"Spoonacular error: {e.status_code}")
+                recipes = None
+
+            if recipes is not None:
                 if recipes:
-                    for recipe_summary in recipes:
-                        recipe = get_recipe_information(recipe_summary['id'])
+                    detailed_recipes = get_recipes_information([r['id'] for r in recipes])
+                    for recipe in detailed_recipes:
                         if recipe:
                             st.markdown("---")
                             st.subheader(f"🍽️ {recipe['title']}")
@@ -168,8 +131,6 @@ if uploaded_file:
                                         st.info("Already in favorites.")
                 else:
                     st.warning("No recipes found.")
-            else:
-                st.error(f"Spoonacular error: {res.status_code}")
     else:
         st.warning("No ingredients detected.")
 
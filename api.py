@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from clarifai import MAX_BATCH_WORKERS, ClarifaiError
+from pipeline import (
+    RECIPE_COUNT, detect_ingredients, find_recipe_summaries, get_recipe_details, get_recipes, prepare_uploads
+)
+from spoonacular import MAX_DETAIL_WORKERS, SpoonacularError
+from telemetry import bind, set_session
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", 8080))
+# Blocking core calls in flight at once, per upstream. Requests beyond these wait on the
+# event loop, which costs a coroutine rather than a thread
+UPSTREAM_LIMITS = {
+    "image": os.cpu_count() or 2,
+    "clarifai": MAX_BATCH_WORKERS,
+    "spoonacular": MAX_DETAIL_WORKERS,
+}
+# Largest request body, and most images per request
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_IMAGES = 10
+# Most recipes per /suggest; each one not yet cached costs Spoonacular quota shared by every client
+MAX_RECIPE_COUNT = 20
+
+LIMITS = web.AppKey("limits", dict)
+POOL = web.AppKey("pool", ThreadPoolExecutor)
+
+
+async def call(request, upstream, fn, *args):
+    # Runs a blocking core call on the worker threads, within the upstream's limit
+    async with request.app[LIMITS][upstream]:
+        return await asyncio.get_running_loop().run_in_executor(request.app[POOL], bind(fn), *args)
+
+
+def error(status, message):
+    return web.json_response({"error": message}, status=status)
+
+
+@web.middleware
+async def session_middleware(request, handler):
+    # Telemetry of each request is tagged with the client's session, as in the app;
+    # client errors are answered in the same JSON shape as upstream ones
+    set_session(request.headers.get("X-Session-Id") or uuid.uuid4().hex)
+    try:
+        return await handler(request)
+    except web.HTTPClientError as e:
+        return error(e.status, e.text)
+
+
+async def read_images(request):
+    # Image bytes from a multipart upload (every file part) or a raw image body
+    if request.content_type.startswith("multipart/"):
+        images = []
+        total = 0
+        reader = await request.multipart()
+        async for part in reader:
+            if part.filename is None:
+                continue
+            data = await part.read()
+            total += len(data)
+            if total > MAX_UPLOAD_BYTES:
+                raise web.HTTPRequestEntityTooLarge(
+                    max_size=MAX_UPLOAD_BYTES, actual_size=total, text=f"Uploads over {MAX_UPLOAD_BYTES} bytes")
+            images.append(data)
+    else:
+        images = [await request.read()]
+    images = [data for data in images if data]
+    if not images:
+        raise web.HTTPBadRequest(text="No images uploaded")
+    if len(images) > MAX_IMAGES:
+        raise web.HTTPBadRequest(text=f"At most {MAX_IMAGES} images per request")
+    return images
+
+
+async def detect(request, images):
+    try:
+        prepared = await call(request, "image", prepare_uploads, images)
+    except OSError:
+        raise web.HTTPBadRequest(text="Unreadable image")
+    return await call(request, "clarifai", detect_ingredients, prepared)
+
+
+def query_int(request, name, default, choices=None, max_value=None):
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+    if value < 1 or (choices and value not in choices) or (max_value and value > max_value):
+        raise web.HTTPBadRequest(text=f"Invalid {name}: {value}")
+    return value
+
+
+async def handle_detect(request):
+    # POST images -> {"ingredients": [...]}
+    images = await read_images(request)
+    try:
+        ingredients = await detect(request, images)
+    except ClarifaiError as e:
+        return error(502, str(e))
+    return web.json_response({"ingredients": ingredients})
+
+
+async def handle_suggest(request):
+    # POST images, or JSON {"ingredients": [...]}; ?number=&ranking= as in findByIngredients.
+    # Streams NDJSON as each stage finishes: {"ingredients"}, {"summaries"}, one {"recipe"}
+    # per recipe, then {"done"}; a failure ends it with {"error"}
+    number = query_int(request, "number", RECIPE_COUNT, max_value=MAX_RECIPE_COUNT)
+    ranking = query_int(request, "ranking", 1, choices=(1, 2))
+    if request.content_type == "application/json":
+        try:
+            ingredients = (await request.json())["ingredients"]
+        except (ValueError, KeyError, TypeError):
+            ingredients = None
+        # A bare string would otherwise be searched letter by letter
+        if not isinstance(ingredients, list) or not all(isinstance(name, str) for name in ingredients):
+            return error(400, 'Expected {"ingredients": [...]}')
+    else:
+        images = await read_images(request)
+        try:
+            ingredients = await detect(request, images)
+        except ClarifaiError as e:
+            return error(502, str(e))
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+
+    async def send(record):
+        await response.write((json.dumps(record, separators=(",", ":")) + "\n").encode())
+
+    await send({"ingredients": ingredients})
+    if not ingredients:
+        await send({"done": True})
+        return response
+    try:
+        summaries = await call(request, "spoonacular", find_recipe_summaries, ingredients, number, ranking)
+    except SpoonacularError as e:
+        await send({"error": str(e)})
+        return response
+    await send({"summaries": summaries})
+
+    # Recipes not cached yet come from one informationBulk round trip, not a call each;
+    # recipes that fail to load are skipped
+    recipes = await call(request, "spoonacular", get_recipes, [summary["id"] for summary in summaries])
+    for recipe in recipes:
+        await send({"recipe": recipe.to_json()})
+    await send({"done": True})
+    return response
+
+
+async def handle_recipe(request):
+    # GET one recipe by Spoonacular id
+    try:
+        recipe_id = int(request.match_info["recipe_id"])
+    except ValueError:
+        return error(400, "Recipe id must be an integer")
+    recipe = await call(request, "spoonacular", get_recipe_details, recipe_id)
+    if recipe is None:
+        return error(404, f"Recipe {recipe_id} not found or unavailable")
+    return web.json_response(recipe.to_json())
+
+
+async def on_startup(app):
+    # Semaphores belong to the running loop, so they are made here rather than at import
+    app[LIMITS] = {upstream: asyncio.Semaphore(limit) for upstream, limit in UPSTREAM_LIMITS.items()}
+    app[POOL] = ThreadPoolExecutor(max_workers=sum(UPSTREAM_LIMITS.values()), thread_name_prefix="api")
+
+
+async def on_cleanup(app):
+    app[POOL].shutdown(wait=False)
+
+
+def make_app():
+    app = web.Application(client_max_size=MAX_UPLOAD_BYTES, middlewares=[session_middleware])
+    app.router.add_post("/detect", handle_detect)
+    app.router.add_post("/suggest", handle_suggest)
+    app.router.add_get("/recipe/{recipe_id}", handle_recipe)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON API for ingredient detection and recipe suggestions.")
+    parser.add_argument("--host", default=API_HOST, help="interface to listen on")
+    parser.add_argument("--port", type=int, default=API_PORT, help="port to listen on")
+    args = parser.parse_args(argv)
+    web.run_app(make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
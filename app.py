@@ -1,18 +1,30 @@
 import streamlit as st
-import requests
-from PIL import Image
-import io
-import os
-import json
-from dotenv import load_dotenv
-from fpdf import FPDF
-import base64
 import random
+import uuid
+import telemetry
+from assets import build_assets, page_css, static_url
+from cache import content_hash, get_cache
+from favorites import get_store
+from jobs import get_queue
+# Modules pulling in requests, PIL, numpy or fpdf are imported where first needed,
+# so the first paint (no uploads yet) does not wait for them
 
-# Load API keys
-load_dotenv()
-CLARIFAI_API_KEY = os.getenv("CLARIFAI_API_KEY")
-SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")
+# Number of uploads whose pipeline results are kept in a session
+PIPELINE_MEMO_SIZE = 5
+# Favorites listed per sidebar page
+FAVORITES_PAGE_SIZE = 10
+# Seconds between status checks of a background job
+JOB_POLL_SECONDS = 0.5
+# Tail of the telemetry file the stats page summarizes
+STATS_WINDOW_BYTES = 2 * 1024 * 1024
+# Recipes listed per page of the recipe browser
+BROWSE_PAGE_SIZE = 10
+# Longest readyInMinutes the browser's slider offers; the top of the range means any
+BROWSE_MAX_MINUTES = 120
+# Diet facet -> label
+DIET_LABELS = {"vegetarian": "Vegetarian", "vegan": "Vegan", "gluten_free": "Gluten free", "dairy_free": "Dairy free"}
+# Sort -> label
+SORT_LABELS = {"health": "Healthiest", "ready": "Quickest", "price": "Cheapest"}
 
 # Configure page
 st.set_page_config(
@@ -22,111 +34,42 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS with background image
-st.markdown(f"""
-<style>
-   .stApp {{
-        background-image: linear-gradient(rgba(71, 77, 86, 0.85), rgba(71, 77, 86, 0.85)), 
-                          url("https://images.unsplash.com/photo-1490645935967-10de6ba17061?ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D&auto=format&fit=crop&w=1953&q=80");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-        background-repeat: no-repeat;
-    }}
-    .main-container {{
-        background-color: rgba(255, 255, 255, 0.9);
-        border-radius: 15px;
-        padding: 2rem;
-        margin: 2rem 0;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.15);
-    }}
-    .st-emotion-cache-18ni7ap {{
-        background-color: rgba(255, 255, 255, 0.9) !important;
-    }}
-    .sidebar .sidebar-content {{
-        background-color: rgba(255, 255, 255, 0.95);
-    }}
-    .stButton>button {{
-        background-color: #ff6b6b;
-        color: white;
-        border-radius: 10px;
-        padding: 10px 24px;
-        transition: all 0.3s;
-        border: none;
-        font-weight: bold;
-    }}
-    .stButton>button:hover {{
-        background-color: #ff5252;
-        transform: scale(1.05);
-        box-shadow: 0 2px 10px rgba(255,107,107,0.4);
-    }}
-    .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {{
-        color: #333;
-        font-family: 'Arial Rounded MT Bold', sans-serif;
-    }}
-    .stMarkdown h1 {{
-        text-align: center;
-        color: #ff6b6b;
-        text-shadow: 1px 1px 3px rgba(0,0,0,0.1);
-    }}
-    .recipe-card {{
-        border-radius: 15px;
-        padding: 20px;
-        margin: 15px 0;
-        background: white;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        transition: transform 0.3s;
-        border: 1px solid #eee;
-    }}
-    .recipe-card:hover {{
-        transform: translateY(-5px);
-        box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-    }}
-    .ingredient-item {{
-        padding: 8px 0;
-        border-bottom: 1px dashed #eee;
-    }}
-    .footer {{
-        text-align: center;
-        margin-top: 30px;
-        padding-top: 20px;
-        border-top: 1px solid #eee;
-        color: #666;
-        font-size: 0.9em;
-    }}
-    .file-uploader {{
-        background-color: rgba(255,255,255,0.8);
-        border-radius: 10px;
-        padding: 20px;
-    }}
-    .tab-content {{
-        padding: 15px 0;
-    }}
-    .recipe-nav {{
-        display: flex;
-        justify-content: center;
-        gap: 10px;
-        margin-bottom: 20px;
-    }}
-    .recipe-nav button {{
-        background-color: #ff6b6b;
-        color: white;
-        border: none;
-        border-radius: 50%;
-        width: 40px;
-        height: 40px;
-        font-weight: bold;
-        cursor: pointer;
-    }}
-    .recipe-nav button:hover {{
-        background-color: #ff5252;
-    }}
-</style>
-""", unsafe_allow_html=True)
+# Tag telemetry from this session so quota use can be budgeted per user
+st.session_state.setdefault("session_id", uuid.uuid4().hex)
+telemetry.set_session(st.session_state.session_id)
+
+# Hidden stats page: add ?stats=1 to the URL
+if st.query_params.get("stats"):
+    st.title("📊 Pipeline Stats")
+    records = telemetry.read_records(max_bytes=STATS_WINDOW_BYTES)
+    st.caption(f"Last {len(records)} records")
+    st.markdown("### Latency per stage (ms)")
+    st.dataframe(telemetry.stage_stats(records), use_container_width=True)
+    st.markdown("### Spoonacular quota per session")
+    st.dataframe(
+        [dict(session=session, **row) for session, row in telemetry.quota_by_session(records).items()],
+        use_container_width=True
+    )
+    st.markdown("### Background jobs")
+    st.json(get_queue().counts())
+    from image_cache import cache_stats
+    st.markdown("### Recipe image cache")
+    st.json(cache_stats())
+    st.markdown("### Shared response cache")
+    st.json(get_cache().memory_stats())
+    st.dataframe(
+        [dict(namespace=namespace, **row) for namespace, row in get_cache().stats().items()],
+        use_container_width=True
+    )
+    st.stop()
+
+# Custom CSS with the locally served background image
+build_assets()
+st.markdown(page_css(), unsafe_allow_html=True)
 
 # Sidebar
 with st.sidebar:
-    st.image("https://images.unsplash.com/photo-1562923690-e274ba919781?q=80&w=1976&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D", use_container_width=True)
+    st.markdown(f'<img src="{static_url("sidebar.jpg")}" style="width: 100%; border-radius: 10px;">', unsafe_allow_html=True)
     st.title("AI Recipe Generator")
     st.markdown("""
     *How it works:*
@@ -138,93 +81,95 @@ with st.sidebar:
     st.markdown("### About")
     st.markdown("This app uses AI to transform your ingredients into culinary masterpieces!")
 
-def clarifai_predict(image_base64):
-    url = "https://api.clarifai.com/v2/models/food-item-recognition/outputs"
-    headers = {
-        "Authorization": f"Key {CLARIFAI_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "inputs": [
-            {
-                "data": {
-                    "image": {
-                        "base64": image_base64
-                    }
-                }
-            }
-        ]
-    }
-    response = requests.post(url, headers=headers, json=data)
-    if response.status_code != 200:
-        st.error(f"Clarifai API error: {response.status_code} {response.text}")
-        return []
-    outputs = response.json()["outputs"][0]["data"].get("concepts", [])
-    return [concept['name'] for concept in outputs if concept['value'] > 0.85]
-
-def get_recipe_information(recipe_id):
-    url = f"https://api.spoonacular.com/recipes/{recipe_id}/information"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY
-    }
-    res = requests.get(url, params=params)
-    if res.status_code == 200:
-        return res.json()
-    return None
-
-def create_recipe_pdf(recipe):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=16, style='B')
-    pdf.cell(200, 10, txt=recipe["title"], ln=True, align='C')
-    pdf.ln(10)
-    
-    # Add recipe image if available
-    if recipe.get("image"):
-        try:
-            image_data = requests.get(recipe["image"]).content
-            temp_img = io.BytesIO(image_data)
-            pdf.image(temp_img, x=50, w=110)
-        except:
-            pass
-    
-    pdf.ln(10)
-    pdf.set_font("Arial", style='B', size=14)
-    pdf.cell(200, 10, txt="Ingredients:", ln=True)
-    pdf.set_font("Arial", size=12)
-    for ing in recipe.get("extendedIngredients", []):
-        desc = ing.get('originalString') or ing.get('original') or ing.get('name') or "Ingredient details missing"
-        pdf.multi_cell(0, 10, f"- {desc}")
-
-    pdf.ln(10)
-    pdf.set_font("Arial", style='B', size=14)
-    pdf.cell(200, 10, txt="Instructions:", ln=True)
-    pdf.set_font("Arial", size=12)
-    if recipe.get("instructions"):
-        # Clean HTML tags from instructions
-        import re
-        clean_instructions = re.sub('<[^<]+?>', '', recipe["instructions"])
-        pdf.multi_cell(0, 10, clean_instructions)
-    else:
-        pdf.multi_cell(0, 10, "No instructions available.")
-
-    # Return PDF as bytes instead of saving to file
-    return pdf.output(dest='S').encode('latin-1')
+def clarifai_predict(prepared):
+    from clarifai import ClarifaiError
+    from pipeline import detect_ingredients
+    try:
+        return detect_ingredients(prepared)
+    except ClarifaiError as e:
+        st.error(str(e))
+        return None
+
+def pipeline_state(uploads):
+    # Results for each set of uploads are kept per session, keyed by content hash,
+    # so reruns from widget clicks make no network requests
+    memo = st.session_state.setdefault("pipeline_memo", {})
+    key = content_hash("".join(sorted(content_hash(upload) for upload in uploads)))
+    if st.session_state.get("upload_key") != key:
+        st.session_state.upload_key = key
+        st.session_state.recipe_index = 0
+    if key not in memo:
+        if len(memo) >= PIPELINE_MEMO_SIZE:
+            memo.pop(next(iter(memo)))
+        memo[key] = {}
+    return memo[key]
+
+def export_cookbook(recipes, file_name, key):
+    from pdf_export import create_cookbook_pdf
+    progress_bar = st.progress(0.0, text="📚 Rendering cookbook...")
+    pdf_bytes = create_cookbook_pdf(
+        recipes,
+        progress=lambda done, total: progress_bar.progress(done / total, text=f"📚 Rendered {done} of {total} recipes")
+    )
+    progress_bar.empty()
+    st.download_button(
+        label="⬇️ Download Cookbook",
+        data=pdf_bytes,
+        file_name=file_name,
+        mime="application/pdf",
+        key=key
+    )
+
+def write_favorites(recipes):
+    from recipe_index import get_index
+    get_index().add_many(recipes, favorite=True)
+    return get_store().add_many(recipes)
 
 def save_favorite_recipe(recipe):
-    fav_path = "favorites.json"
-    if os.path.exists(fav_path):
-        with open(fav_path, "r") as f:
-            favorites = json.load(f)
-    else:
-        favorites = []
-
-    if recipe["id"] not in [r["id"] for r in favorites]:
-        favorites.append(recipe)
-        with open(fav_path, "w") as f:
-            json.dump(favorites, f, indent=2)
-        return True
-    return False
+    # Queued; favorites saved meanwhile by any session are written in one transaction
+    return get_queue().submit_batch("favorites", write_favorites, recipe)
+
+def render_recipe_pdf(recipe):
+    from pdf_export import create_recipe_pdf
+    return create_recipe_pdf(recipe)
+
+def prerender_pdf(recipe):
+    # Started as soon as a recipe is shown, so the PDF is usually ready before it is asked for
+    return get_queue().submit("pdf", render_recipe_pdf, recipe, key=f"pdf:{recipe.id}")
+
+def wait_for_pdf(job_id, recipe):
+    # The prerendered PDF, or a fresh render if the job has already been pruned from the queue
+    try:
+        return get_queue().wait(job_id)
+    except KeyError:
+        return render_recipe_pdf(recipe)
+
+def recipe_thumbnail(url):
+    # The locally cached thumbnail; the first time, the browser loads the remote image
+    # while a background job caches it for later views and PDF exports. None when the
+    # recipe has no image
+    from image_cache import cached_path, get_image_path
+    if not url:
+        return None
+    path = cached_path(url, "thumb")
+    if path:
+        return path
+    get_queue().submit("image", get_image_path, url, "thumb", key=f"image:{url}")
+    return url
+
+def job_status(job_id, render):
+    # Draws render(job); while the job is unfinished only this fragment reruns, to poll it
+    job = get_queue().status(job_id)
+    pending = job is not None and job["state"] in ("queued", "running")
+
+    @st.fragment(run_every=JOB_POLL_SECONDS if pending else None)
+    def poll():
+        current = get_queue().status(job_id)
+        if pending and (current is None or current["state"] not in ("queued", "running")):
+            # Finished: one full rerun redraws the page and stops the polling
+            st.rerun()
+        render(current)
+    poll()
 
 def generate_ai_reason(ingredients, title):
     cooking_styles = ["stir-fry", "roast", "bake", "grill", "steam", "sauté"]
@@ -234,6 +179,56 @@ def generate_ai_reason(ingredients, title):
     reason += f"*{title}* brings out the best in {random.choice(ingredients)} and can be prepared in under 30 minutes!"
     return reason
 
+# Favorites browser, paged so a large collection loads lazily
+with st.sidebar:
+    st.markdown("---")
+    favorites = get_store()
+    favorite_count = favorites.count()
+    st.markdown(f"### ⭐ Favorites ({favorite_count})")
+    if favorite_count:
+        page_count = (favorite_count + FAVORITES_PAGE_SIZE - 1) // FAVORITES_PAGE_SIZE
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key="favorites_page")
+        for _, favorite_title in favorites.titles((page - 1) * FAVORITES_PAGE_SIZE, FAVORITES_PAGE_SIZE):
+            st.markdown(f"- {favorite_title}")
+        if st.button("📚 Export Cookbook", key="export_favorites"):
+            export_cookbook(favorites.iter_all(), "favorites-cookbook.pdf", "download_favorites")
+
+# Faceted browser over every cached and favorited recipe. Behind a toggle, so the first
+# paint does not build the index
+with st.sidebar:
+    if st.toggle("🔎 Browse recipes", key="browse"):
+        from recipe_index import get_index
+
+        diets = st.multiselect("Diet", list(DIET_LABELS), format_func=DIET_LABELS.get, key="browse_diets")
+        max_ready = st.slider("Ready in (minutes)", 10, BROWSE_MAX_MINUTES, BROWSE_MAX_MINUTES, step=5, key="browse_ready")
+        favorites_only = st.checkbox("Favorites only", key="browse_favorites")
+        sort = st.selectbox("Sort by", list(SORT_LABELS), format_func=SORT_LABELS.get, key="browse_sort")
+        facets = dict(
+            diets=diets,
+            max_ready=None if max_ready >= BROWSE_MAX_MINUTES else max_ready,
+            favorites_only=favorites_only,
+        )
+        total, _ = get_index().filter(**facets, limit=0)
+        st.caption(f"{total} recipes")
+        browse_page = 1
+        if total > BROWSE_PAGE_SIZE:
+            browse_page_count = (total + BROWSE_PAGE_SIZE - 1) // BROWSE_PAGE_SIZE
+            # Narrower facets can leave the remembered page past the end
+            if st.session_state.get("browse_page", 1) > browse_page_count:
+                st.session_state.browse_page = browse_page_count
+            browse_page = st.number_input("Page", min_value=1, max_value=browse_page_count, key="browse_page")
+        _, results = get_index().filter(**facets, sort=sort, offset=(browse_page - 1) * BROWSE_PAGE_SIZE, limit=BROWSE_PAGE_SIZE)
+        for result in results:
+            details = []
+            if result["readyInMinutes"] is not None:
+                details.append(f"{result['readyInMinutes']:.0f} min")
+            if result["healthScore"] is not None:
+                details.append(f"health {result['healthScore']:.0f}")
+            if result["pricePerServing"] is not None:
+                details.append(f"${result['pricePerServing'] / 100:.2f}/serving")
+            star = "⭐ " if result["favorite"] else ""
+            st.markdown(f"- {star}**{result['title']}**" + "".join(f" · {detail}" for detail in details))
+
 # Main content container
 with st.container():
     st.markdown('<div class="main-container">', unsafe_allow_html=True)
@@ -242,27 +237,42 @@ with st.container():
     st.markdown("### Transform your ingredients into delicious meals!")
     
     # File uploader with custom styling
-    uploaded_file = st.file_uploader(
-        "📤 Upload an image of your ingredients", 
+    uploaded_files = st.file_uploader(
+        "📤 Upload images of your ingredients", 
         type=["jpg", "jpeg", "png"],
-        help="Take a photo of your fridge or pantry ingredients"
+        accept_multiple_files=True,
+        help="Take photos of your fridge, pantry or counter"
     )
 
-    if uploaded_file:
+    if uploaded_files:
+        from pipeline import RECIPE_COUNT, find_recipe_summaries, get_recipes, prefetch_recipe, prepare_uploads
+        from spoonacular import SpoonacularError
+
+        upload_bytes = [uploaded_file.getvalue() for uploaded_file in uploaded_files]
+        pipeline = pipeline_state(upload_bytes)
         col1, col2 = st.columns([1, 2])
         
         with col1:
             st.markdown("### Your Ingredients")
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Your delicious ingredients", use_container_width=True)
+            # Only decode, downscale and detect the first time these uploads are seen
+            if "images" not in pipeline:
+                pipeline["images"] = prepare_uploads(upload_bytes)
+            prepared = pipeline["images"]
+            st.image(
+                [image["bytes"] for image in prepared],
+                caption=[uploaded_file.name for uploaded_file in uploaded_files],
+                use_container_width=True
+            )
+            original_kb = sum(image["original_bytes"] for image in prepared) / 1024
+            prepared_kb = sum(len(image["bytes"]) for image in prepared) / 1024
+            st.caption(f"📦 Upload size: {original_kb:.0f} KB → {prepared_kb:.0f} KB")
             
-            buffered = io.BytesIO()
-            image.save(buffered, format="JPEG")
-            img_bytes = buffered.getvalue()
-            img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-
-            with st.spinner("🔍 Detecting ingredients..."):
-                ingredients = clarifai_predict(img_base64)
+            if "ingredients" not in pipeline:
+                with st.spinner("🔍 Detecting ingredients..."):
+                    ingredients = clarifai_predict(prepared)
+                if ingredients is not None:
+                    pipeline["ingredients"] = ingredients
+            ingredients = pipeline.get("ingredients", [])
 
             if ingredients:
                 st.success("✅ Detected ingredients!")
@@ -275,99 +285,131 @@ with st.container():
         if ingredients:
             with col2:
                 st.markdown("### Recipe Suggestions")
-                with st.spinner("🧑‍🍳 Finding perfect recipes for you..."):
-                    params = {
-                        "apiKey": SPOONACULAR_API_KEY,
-                        "ingredients": ",".join(ingredients),
-                        "number": 3,
-                        "ranking": 1
-                    }
-                    res = requests.get("https://api.spoonacular.com/recipes/findByIngredients", params=params)
-
-                    if res.status_code == 200:
-                        recipes = res.json()
-                        if recipes:
-                            # Initialize session state for recipe navigation
-                            if 'recipe_index' not in st.session_state:
-                                st.session_state.recipe_index = 0
+                if "summaries" not in pipeline:
+                    with st.spinner("🧑‍🍳 Finding perfect recipes for you..."):
+                        try:
+                            pipeline["summaries"] = find_recipe_summaries(ingredients, number=RECIPE_COUNT, ranking=1)
+                        except SpoonacularError as e:
+                            st.error(f"Error fetching recipes: {e.status_code or e.text}")
+                summaries = pipeline.get("summaries")
+                details = pipeline.setdefault("details", {})
+
+                if summaries:
+                    # Recipe navigation buttons
+                    st.markdown('<div class="recipe-nav">', unsafe_allow_html=True)
+                    nav_cols = st.columns(len(summaries))
+                    for i, nav_col in enumerate(nav_cols):
+                        with nav_col:
+                            if st.button(str(i + 1), key=f"nav_{i + 1}"):
+                                st.session_state.recipe_index = i
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    if st.button("📚 Export All Suggestions", key="export_suggestions"):
+                        export_cookbook(
+                            get_recipes([summary['id'] for summary in summaries]),
+                            "suggestions-cookbook.pdf",
+                            "download_suggestions"
+                        )
+                    
+                    # Display the current recipe based on index
+                    st.session_state.recipe_index = min(st.session_state.recipe_index, len(summaries) - 1)
+                    summary = summaries[st.session_state.recipe_index]
+                    with st.container():
+                        st.markdown(f'<div class="recipe-card">', unsafe_allow_html=True)
+                        
+                        # Recipe header from the search result, shown before the details load
+                        col_img, col_title = st.columns([1, 3])
+                        with col_img:
+                            thumbnail = recipe_thumbnail(summary.get('image'))
+                            if thumbnail:
+                                st.image(thumbnail, width=150)
+                        with col_title:
+                            st.markdown(f"#### {summary['title']}")
+                            details_caption = st.empty()
+                        
+                        # Why this recipe
+                        with st.expander("🤖 AI Recommendation"):
+                            st.markdown(generate_ai_reason(ingredients, summary['title']))
+                        
+                        # Full details are only fetched for the recipe being viewed
+                        if summary['id'] not in details:
+                            with st.spinner("📖 Loading recipe details..."):
+                                recipe = prefetch_recipe(summary['id']).result()
+                            if recipe:
+                                details[summary['id']] = recipe
+                        recipe = details.get(summary['id'])
+                        
+                        # Fetch the next suggestion in the background while this one is read
+                        next_index = st.session_state.recipe_index + 1
+                        if next_index < len(summaries) and summaries[next_index]['id'] not in details:
+                            prefetch_recipe(summaries[next_index]['id'])
+                        
+                        if recipe:
+                            details_caption.caption(f"🕒 Ready in {recipe.ready_in_minutes or 'N/A'} minutes | 👨‍👩‍👧‍👦 Serves {recipe.servings or 'N/A'}")
+                            
+                            # Ingredients and instructions tabs
+                            tab1, tab2 = st.tabs(["🧂 Ingredients", "📝 Instructions"])
+                            
+                            with tab1:
+                                for ing in recipe.ingredients:
+                                    st.markdown(f'<div class="ingredient-item">- {ing.original or "Unknown ingredient"}</div>', unsafe_allow_html=True)
                             
-                            # Get detailed recipe information for all recipes
-                            detailed_recipes = []
-                            for recipe_summary in recipes:
-                                recipe = get_recipe_information(recipe_summary['id'])
-                                if recipe:
-                                    detailed_recipes.append(recipe)
+                            with tab2:
+                                if recipe.instructions:
+                                    st.markdown(recipe.instructions, unsafe_allow_html=True)
+                                else:
+                                    st.warning("No instructions provided for this recipe.")
                             
-                            if detailed_recipes:
-                                # Recipe navigation buttons
-                                st.markdown('<div class="recipe-nav">', unsafe_allow_html=True)
-                                col1, col2, col3 = st.columns(3)
-                                with col1:
-                                    if st.button("1", key="nav_1"):
-                                        st.session_state.recipe_index = 0
-                                with col2:
-                                    if st.button("2", key="nav_2"):
-                                        st.session_state.recipe_index = 1
-                                with col3:
-                                    if st.button("3", key="nav_3"):
-                                        st.session_state.recipe_index = 2
-                                st.markdown('</div>', unsafe_allow_html=True)
-                                
-                                # Display the current recipe based on index
-                                recipe = detailed_recipes[st.session_state.recipe_index]
-                                with st.container():
-                                    st.markdown(f'<div class="recipe-card">', unsafe_allow_html=True)
-                                    
-                                    # Recipe header with image
-                                    col_img, col_title = st.columns([1, 3])
-                                    with col_img:
-                                        st.image(recipe['image'], width=150)
-                                    with col_title:
-                                        st.markdown(f"#### {recipe['title']}")
-                                        st.caption(f"🕒 Ready in {recipe.get('readyInMinutes', 'N/A')} minutes | 👨‍👩‍👧‍👦 Serves {recipe.get('servings', 'N/A')}")
-                                    
-                                    # Why this recipe
-                                    with st.expander("🤖 AI Recommendation"):
-                                        st.markdown(generate_ai_reason(ingredients, recipe['title']))
-                                    
-                                    # Ingredients and instructions tabs
-                                    tab1, tab2 = st.tabs(["🧂 Ingredients", "📝 Instructions"])
-                                    
-                                    with tab1:
-                                        for ing in recipe.get('extendedIngredients', []):
-                                            desc = ing.get('originalString') or ing.get('original') or ing.get('name') or "Unknown ingredient"
-                                            st.markdown(f'<div class="ingredient-item">- {desc}</div>', unsafe_allow_html=True)
-                                    
-                                    with tab2:
-                                        if recipe.get("instructions"):
-                                            st.markdown(recipe["instructions"], unsafe_allow_html=True)
-                                        else:
-                                            st.warning("No instructions provided for this recipe.")
-                                    
-                                    # Action buttons
-                                    col_dl, col_fav, _ = st.columns([2, 2, 4])
-                                    with col_dl:
-                                        if st.button("📄 Download PDF", key=f"pdf_{recipe['id']}"):
-                                            pdf_bytes = create_recipe_pdf(recipe)
-                                            st.download_button(
-                                                label="⬇️ Download Now",
-                                                data=pdf_bytes,
-                                                file_name=f"{recipe['title']}.pdf",
-                                                mime="application/pdf"
-                                            )
-                                    with col_fav:
-                                        if st.button("⭐ Save Favorite", key=f"fav_{recipe['id']}"):
-                                            if save_favorite_recipe(recipe):
-                                                st.success("Saved to favorites!")
-                                            else:
-                                                st.info("Already in favorites")
-                                    
-                                    st.markdown('</div>', unsafe_allow_html=True)
-                                    st.write("")
+                            # Action buttons; the PDF and favorites writes run as background jobs
+                            col_dl, col_fav, _ = st.columns([2, 2, 4])
+                            with col_dl:
+                                pdf_job = prerender_pdf(recipe)
+
+                                def pdf_button(job, recipe=recipe, pdf_job=pdf_job):
+                                    ready = job is not None and job["state"] == "done"
+                                    # Until the PDF is ready, a click waits for the job instead of rendering again
+                                    st.download_button(
+                                        label="📄 Download PDF",
+                                        data=job["result"] if ready else lambda: wait_for_pdf(pdf_job, recipe),
+                                        file_name=f"{recipe.title}.pdf",
+                                        mime="application/pdf",
+                                        key=f"pdf_{recipe.id}",
+                                        on_click="ignore"
+                                    )
+                                    if job is not None and job["state"] == "failed":
+                                        st.caption("⚠️ PDF could not be rendered")
+                                    elif not ready:
+                                        st.caption("⏳ Preparing PDF...")
+
+                                job_status(pdf_job, pdf_button)
+                            with col_fav:
+                                favorite_jobs = st.session_state.setdefault("favorite_jobs", {})
+                                if st.button("⭐ Save Favorite", key=f"fav_{recipe.id}"):
+                                    favorite_jobs[recipe.id] = save_favorite_recipe(recipe)
+
+                                def favorite_status(job, recipe=recipe):
+                                    if job is None:
+                                        return
+                                    if job["state"] in ("queued", "running"):
+                                        st.caption("⏳ Saving...")
+                                    elif job["state"] == "failed":
+                                        st.error("Could not save the favorite. Try again.")
+                                    elif recipe.id in job["result"]:
+                                        st.success("Saved to favorites!")
+                                    else:
+                                        st.info("Already in favorites")
+
+                                if recipe.id in favorite_jobs:
+                                    job_status(favorite_jobs[recipe.id], favorite_status)
                         else:
-                            st.warning("No recipes found. Try different ingredients!")
-                    else:
-                        st.error(f"Error fetching recipes: {res.status_code}")
+                            # Details failed to load; the search result still lists the ingredients
+                            for ing in summary.get('usedIngredients', []) + summary.get('missedIngredients', []):
+                                st.markdown(f'<div class="ingredient-item">- {ing["name"]}</div>', unsafe_allow_html=True)
+                            st.warning("Recipe details are unavailable right now. Try again in a moment.")
+                        
+                        st.markdown('</div>', unsafe_allow_html=True)
+                        st.write("")
+                elif summaries is not None:
+                    st.warning("No recipes found. Try different ingredients!")
     
     st.markdown('</div>', unsafe_allow_html=True)
 
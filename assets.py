@@ -0,0 +1,55 @@
+import functools
+import os
+import re
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+SOURCE_IMAGE = os.path.join(ROOT, "bg2.jpg")
+# URL prefix Streamlit serves static/ under when enableStaticServing is on
+STATIC_URL = "app/static"
+
+# Optimized copies of bg2.jpg: name -> (crop box or None, max width, JPEG quality)
+IMAGE_VARIANTS = {
+    "background.jpg": (None, 1440, 65),
+    "sidebar.jpg": ((0, 90, 570, 770), 400, 75),
+}
+
+
+def build_assets(force=False):
+    # Only runs the first time (or with force); afterwards the files are just served
+    missing = [name for name in IMAGE_VARIANTS if force or not os.path.exists(os.path.join(STATIC_DIR, name))]
+    if not missing:
+        return []
+    from PIL import Image
+
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    with Image.open(SOURCE_IMAGE) as source:
+        source = source.convert("RGB")
+        for name in missing:
+            box, max_width, quality = IMAGE_VARIANTS[name]
+            image = source.crop(box) if box else source.copy()
+            if image.width > max_width:
+                image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+            image.save(os.path.join(STATIC_DIR, name), format="JPEG", quality=quality, optimize=True, progressive=True)
+    return missing
+
+
+def static_url(name):
+    return f"{STATIC_URL}/{name}"
+
+
+@functools.lru_cache(maxsize=None)
+def page_css():
+    # Read and minified once per process; reruns re-emit the same string
+    with open(os.path.join(STATIC_DIR, "style.css"), "r") as f:
+        css = f.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return f"<style>{css}</style>"
+
+
+if __name__ == "__main__":
+    for name in build_assets(force=True):
+        path = os.path.join(STATIC_DIR, name)
+        print(f"{path}: {os.path.getsize(path) // 1024} KB")
@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from clarifai import ClarifaiError, detect_ingredients
+from http_client import get_client
+from imageprep import prepare_image
+from pipeline import RECIPE_COUNT, suggest_recipes
+from spoonacular import SpoonacularError
+from telemetry import bind, set_session
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# Recipe fields written to each output line, by output key
+RECIPE_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "image": "image",
+    "readyInMinutes": "ready_in_minutes",
+    "servings": "servings",
+    "sourceUrl": "source_url",
+}
+
+
+def find_images(source):
+    # A directory is walked for images; any other file is a manifest with one path per line
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+        return sorted(paths)
+    base = os.path.dirname(source)
+    with open(source, "r") as f:
+        return [os.path.join(base, line.strip()) for line in f if line.strip() and not line.startswith("#")]
+
+
+def completed_images(output_path):
+    # Images that already have a successful line; the output file doubles as the checkpoint
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not record.get("error"):
+                done.add(record["image"])
+    return done
+
+
+def process_image(path, number, ranking):
+    started = time.perf_counter()
+    record = {"image": path, "ingredients": [], "recipes": [], "error": None}
+    try:
+        with open(path, "rb") as f:
+            prepared = prepare_image(f.read())
+        record["ingredients"] = detect_ingredients(prepared["bytes"], phash=prepared["phash"])
+        if record["ingredients"]:
+            recipes = suggest_recipes(record["ingredients"], number=number, ranking=ranking)
+            record["recipes"] = [
+                {key: getattr(recipe, field) for key, field in RECIPE_FIELDS.items()} for recipe in recipes
+            ]
+    except (OSError, ClarifaiError, SpoonacularError) as e:
+        record["error"] = str(e)
+    except Exception as e:
+        # Anything else (a decompression bomb, a malformed response...) fails this image only
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run(source, output_path, workers=4, number=RECIPE_COUNT, ranking=1):
+    images = find_images(source)
+    done = completed_images(output_path)
+    pending = [path for path in images if path not in done]
+    print(f"{len(images)} images, {len(done)} already done, {len(pending)} to process", file=sys.stderr)
+
+    set_session(f"batch-{int(time.time())}")
+    client = get_client()
+    calls_before = sum(client.request_counts.values())
+    started = time.perf_counter()
+    processed = failed = 0
+    write_lock = threading.Lock()
+
+    with open(output_path, "a+") as out:
+        # Finish a line cut short by an interrupted run before appending
+        out.seek(0, os.SEEK_END)
+        if out.tell():
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            queue = iter(pending)
+            in_flight = set()
+            while True:
+                # Keep a bounded window of submitted images rather than queueing them all
+                for path in queue:
+                    in_flight.add(pool.submit(bind(process_image), path, number, ranking))
+                    if len(in_flight) >= workers * 2:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    with write_lock:
+                        out.write(json.dumps(record) + "\n")
+                        out.flush()
+                    processed += 1
+                    failed += bool(record["error"])
+
+    elapsed = time.perf_counter() - started
+    calls = sum(client.request_counts.values()) - calls_before
+    stats = {
+        "processed": processed,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(processed / elapsed, 3) if elapsed else 0.0,
+        "api_calls_per_image": round(calls / processed, 3) if processed else 0.0,
+    }
+    print(json.dumps(stats), file=sys.stderr)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect ingredients and suggest recipes for a batch of images.")
+    parser.add_argument("source", help="directory of images, or a manifest file with one image path per line")
+    parser.add_argument("-o", "--output", default="suggestions.jsonl", help="JSONL file to append results to")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="images processed concurrently")
+    parser.add_argument("-n", "--number", type=int, default=RECIPE_COUNT, help="recipes per image")
+    parser.add_argument("--ranking", type=int, choices=(1, 2), default=1,
+                        help="1 maximizes used ingredients, 2 minimizes missing ones")
+    args = parser.parse_args(argv)
+    run(args.source, args.output, workers=args.workers, number=args.number, ranking=args.ranking)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_LEVELS = (1, 10, 50)
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+def make_upload(seed, size=(640, 480)):
+    # Random pixels so every upload has its own content and perceptual hash
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.frombytes("RGB", size, rng.randbytes(size[0] * size[1] * 3))
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=90)
+    return buffered.getvalue()
+
+
+def run_worker(sessions, uploads, number, same_uploads=False):
+    # Runs inside a fresh process whose environment points every API at the fake servers
+    from clarifai import ClarifaiError, detect_ingredients
+    from http_client import get_client
+    from imageprep import prepare_image
+    from pipeline import suggest_recipes
+    from spoonacular import SpoonacularError
+
+    # With same_uploads every session sends the same photos, like many users with similar fridges
+    images = [
+        [make_upload((0 if same_uploads else session * 1000) + i) for i in range(uploads)]
+        for session in range(sessions)
+    ]
+
+    def session_run(session):
+        latencies = []
+        errors = 0
+        for data in images[session]:
+            started = time.perf_counter()
+            try:
+                prepared = prepare_image(data)
+                ingredients = detect_ingredients(prepared["bytes"], phash=prepared["phash"])
+                if ingredients:
+                    suggest_recipes(ingredients, number=number)
+            except (ClarifaiError, SpoonacularError):
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(session_run, range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for session_latencies, _ in results for latency in session_latencies)
+    calls = sum(get_client().request_counts.values())
+    return {
+        "sessions": sessions,
+        "pipelines": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "seconds": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 3),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+        },
+        "api_calls_per_pipeline": round(calls / len(latencies), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_level(base_url, sessions, args):
+    # Each level gets its own process and empty caches, so levels do not warm each other up
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            SPOONACULAR_BASE_URL=base_url,
+            CLARIFAI_BASE_URL=base_url,
+            SPOONACULAR_API_KEY="bench",
+            CLARIFAI_API_KEY="bench",
+            SPOONACULAR_RATE=str(args.spoonacular_rate),
+            RECIPE_CACHE_PATH=os.path.join(tmp, "responses.sqlite"),
+            FAVORITES_PATH=os.path.join(tmp, "favorites.sqlite"),
+            PDF_CACHE_DIR=os.path.join(tmp, "pdf"),
+            TELEMETRY_PATH="",
+        )
+        command = [
+            sys.executable, os.path.abspath(__file__), "--worker",
+            "--sessions", str(sessions), "--uploads", str(args.uploads), "--number", str(args.number),
+        ]
+        if args.same_uploads:
+            command.append("--same-uploads")
+        # Run from a scratch directory so the one-time favorites.json import is skipped
+        output = subprocess.check_output(command, env=env, cwd=tmp, text=True)
+    return json.loads(output)
+
+
+def compare(previous, current):
+    before = {result["sessions"]: result for result in previous["results"]}
+    print(f"{'sessions':>8}{'p50 ms':>22}{'p95 ms':>22}{'throughput/s':>24}", file=sys.stderr)
+    for result in current["results"]:
+        old = before.get(result["sessions"])
+        if not old:
+            continue
+
+        def delta(new_value, old_value):
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            return f"{old_value:.1f}->{new_value:.1f} ({change:+.0f}%)"
+
+        print(
+            f"{result['sessions']:>8}"
+            f"{delta(result['latency_ms']['p50'], old['latency_ms']['p50']):>22}"
+            f"{delta(result['latency_ms']['p95'], old['latency_ms']['p95']):>22}"
+            f"{delta(result['throughput_per_s'], old['throughput_per_s']):>24}",
+            file=sys.stderr
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark against local fake APIs.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=list(DEFAULT_LEVELS),
+                        help="concurrent session counts to measure")
+    parser.add_argument("--uploads", type=int, default=3, help="uploads per session")
+    parser.add_argument("--number", type=int, default=5, help="recipes per suggestion")
+    parser.add_argument("--same-uploads", action="store_true", help="every session uploads the same images")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake responses that fail")
+    parser.add_argument("--spoonacular-rate", type=float, default=1000,
+                        help="client-side Spoonacular requests per second")
+    parser.add_argument("-o", "--output", help="write results JSON here as well as to stdout")
+    parser.add_argument("--compare", help="earlier results JSON to print deltas against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_worker(args.sessions[0], args.uploads, args.number, args.same_uploads), sys.stdout)
+        return
+
+    from benchmarks.fake_servers import start
+
+    upstream, server = start(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    try:
+        results = [run_level(upstream.base_url, sessions, args) for sessions in args.sessions]
+    finally:
+        server.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": round(time.time()),
+        "python": platform.python_version(),
+        "params": {
+            "uploads": args.uploads,
+            "number": args.number,
+            "same_uploads": args.same_uploads,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECIPES_FIXTURE = os.path.join(ROOT, "favorites.json")
+CONCEPTS_FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "clarifai_concepts.json")
+
+DAILY_QUOTA = 1000000
+
+
+class FakeUpstream:
+    # Stand-in for both Clarifai and Spoonacular, replaying recorded payloads.
+    # Every response waits latency_ms (+/- jitter) and fails with error_rate probability.
+
+    def __init__(self, latency_ms=50, jitter_ms=10, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.quota_used = 0.0
+        with open(RECIPES_FIXTURE, "r") as f:
+            self.recipes = json.load(f)
+        with open(CONCEPTS_FIXTURE, "r") as f:
+            self.concepts = json.load(f)
+        buffered = io.BytesIO()
+        Image.new("RGB", (556, 370), (214, 120, 64)).save(buffered, format="JPEG")
+        self.image = buffered.getvalue()
+        self.base_url = None
+
+    def recipe(self, recipe_id):
+        # A recorded payload under a new id, so every id has a distinct recipe
+        recipe = dict(self.recipes[recipe_id % len(self.recipes)])
+        recipe["id"] = recipe_id
+        recipe["title"] = f"{recipe['title']} #{recipe_id}"
+        recipe["image"] = f"{self.base_url}/images/{recipe_id}-556x370.jpg"
+        return recipe
+
+    def image_concepts(self, image_base64):
+        # Deterministic per image: a seeded sample of the recorded concept list
+        seed = int(hashlib.sha256(image_base64.encode("ascii")).hexdigest()[:8], 16)
+        return random.Random(seed).sample(self.concepts, k=min(8, len(self.concepts)))
+
+    def find_by_ingredients(self, ingredients, number):
+        seed = int(hashlib.sha256(ingredients.encode("utf-8")).hexdigest()[:8], 16)
+        ids = random.Random(seed).sample(range(100000, 200000), number)
+        names = ingredients.split(",")
+        return [
+            {
+                "id": recipe_id,
+                "title": self.recipe(recipe_id)["title"],
+                "image": f"{self.base_url}/images/{recipe_id}-312x231.jpg",
+                "usedIngredientCount": len(names),
+                "missedIngredientCount": 2,
+                "usedIngredients": [{"name": name} for name in names],
+                "missedIngredients": [{"name": "salt"}, {"name": "olive oil"}],
+                "likes": 0,
+            }
+            for recipe_id in ids
+        ]
+
+    def make_handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json", points=None):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if points is not None:
+                    with upstream.lock:
+                        upstream.quota_used += points
+                        used = upstream.quota_used
+                    self.send_header("X-API-Quota-Request", f"{points:g}")
+                    self.send_header("X-API-Quota-Used", f"{used:g}")
+                    self.send_header("X-API-Quota-Left", f"{DAILY_QUOTA - used:g}")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _delay_or_fail(self):
+                with upstream.lock:
+                    upstream.requests += 1
+                    delay = max(0.0, upstream.latency_ms + upstream.random.uniform(-1, 1) * upstream.jitter_ms)
+                    fail = upstream.random.random() < upstream.error_rate
+                time.sleep(delay / 1000)
+                if fail:
+                    self._send(503, {"message": "injected failure"})
+                return fail
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path.startswith("/images/"):
+                    return self._send(200, upstream.image, content_type="image/jpeg")
+                if self._delay_or_fail():
+                    return
+                if url.path == "/recipes/findByIngredients":
+                    number = int(params.get("number", 10))
+                    return self._send(200, upstream.find_by_ingredients(params.get("ingredients", ""), number),
+                                      points=1 + 0.01 * number)
+                if url.path == "/recipes/informationBulk":
+                    ids = [int(recipe_id) for recipe_id in params.get("ids", "").split(",") if recipe_id]
+                    return self._send(200, [upstream.recipe(recipe_id) for recipe_id in ids],
+                                      points=1 + 0.5 * max(0, len(ids) - 1))
+                match = re.fullmatch(r"/recipes/(\d+)/information", url.path)
+                if match:
+                    return self._send(200, upstream.recipe(int(match.group(1))), points=1)
+                self._send(404, {"message": "not found"})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self._delay_or_fail():
+                    return
+                if not self.path.endswith("/outputs"):
+                    return self._send(404, {"message": "not found"})
+                inputs = json.loads(body)["inputs"]
+                outputs = [
+                    {"data": {"concepts": upstream.image_concepts(item["data"]["image"]["base64"])}}
+                    for item in inputs
+                ]
+                self._send(200, {"status": {"code": 10000}, "outputs": outputs})
+
+        return Handler
+
+
+def start(host="127.0.0.1", port=0, **options):
+    # Serve in a background thread; returns (upstream, server). Stop with server.shutdown()
+    upstream = FakeUpstream(**options)
+    server = ThreadingHTTPServer((host, port), upstream.make_handler())
+    server.daemon_threads = True
+    upstream.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return upstream, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Clarifai and Spoonacular APIs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    upstream, server = start(port=args.port, latency_ms=args.latency_ms,
+                             jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    print(f"Serving on {upstream.base_url}")
+    print(f"  SPOONACULAR_BASE_URL={upstream.base_url} CLARIFAI_BASE_URL={upstream.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+CACHE_PATH = os.getenv("RECIPE_CACHE_PATH", os.path.join(".cache", "responses.sqlite"))
+
+# Seconds a cached response stays fresh, per endpoint
+DEFAULT_TTLS = {
+    "recipe": 7 * 24 * 3600,
+    "find": 24 * 3600,
+    "clarifai": 30 * 24 * 3600,
+    "clarifai_phash": 30 * 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+# Total size of cached values before least recently used entries are evicted
+MAX_BYTES = 64 * 1024 * 1024
+# Budget for decoded values kept in memory in front of SQLite, shared by every session,
+# charged at their estimated size as Python objects (several times the JSON text)
+MEMORY_MAX_BYTES = int(os.getenv("RECIPE_CACHE_MEMORY", 16 * 1024 * 1024))
+# Memory hits write their access time back to SQLite at most this often per entry, so
+# hot entries are not the first ones evicted from disk
+ACCESS_WRITE_SECONDS = 60
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def decoded_size(value):
+    # Approximate bytes held by a decoded JSON value and everything it contains
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(decoded_size(key) + decoded_size(item) for key, item in value.items())
+    elif isinstance(value, list):
+        size += sum(decoded_size(item) for item in value)
+    return size
+
+
+def ingredients_key(ingredients, number, ranking):
+    normalized = sorted({ing.strip().lower() for ing in ingredients if ing.strip()})
+    return json.dumps([normalized, number, ranking])
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, ttls=None, max_bytes=MAX_BYTES, memory_max_bytes=MEMORY_MAX_BYTES):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.hits = {}
+        self.misses = {}
+        self.memory_hits = {}
+        self.coalesced = {}
+        self.memory_evictions = 0
+        self._lock = threading.Lock()
+        # (namespace, key) -> (value, size, created, accessed written to SQLite), least
+        # recently used first. Values are shared between sessions, so callers must not
+        # mutate what they get back
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        # (namespace, key) -> Future for fetches in progress
+        self._in_flight = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _remember(self, namespace, key, value, created, accessed):
+        # Caller holds the lock
+        old = self._memory.pop((namespace, key), None)
+        if old:
+            self._memory_size -= old[1]
+        size = decoded_size(value)
+        if size > self.memory_max_bytes:
+            return
+        self._memory[(namespace, key)] = (value, size, created, accessed)
+        self._memory_size += size
+        while self._memory_size > self.memory_max_bytes:
+            _, (_, evicted_size, _, _) = self._memory.popitem(last=False)
+            self._memory_size -= evicted_size
+            self.memory_evictions += 1
+
+    def _lookup(self, namespace, key, now):
+        # Caller holds the lock; memory first, then SQLite
+        ttl = self.ttls.get(namespace, DEFAULT_TTL)
+        entry = self._memory.get((namespace, key))
+        if entry is not None and now - entry[2] <= ttl:
+            self._memory.move_to_end((namespace, key))
+            self.memory_hits[namespace] = self.memory_hits.get(namespace, 0) + 1
+            value, size, created, accessed = entry
+            if now - accessed >= ACCESS_WRITE_SECONDS:
+                self._conn.execute(
+                    "UPDATE responses SET accessed = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+                self._memory[(namespace, key)] = (value, size, created, now)
+            return value
+        row = self._conn.execute(
+            "SELECT value, created FROM responses WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None or now - row[1] > ttl:
+            return None
+        self._conn.execute(
+            "UPDATE responses SET accessed = ? WHERE namespace = ? AND key = ?",
+            (now, namespace, key)
+        )
+        value = json.loads(row[0])
+        self._remember(namespace, key, value, row[1], now)
+        return value
+
+    def get(self, namespace, key):
+        with self._lock:
+            value = self._lookup(namespace, key, time.time())
+            counts = self.misses if value is None else self.hits
+            counts[namespace] = counts.get(namespace, 0) + 1
+        return value
+
+    def get_many_or_fetch(self, namespace, keys, fetch_many):
+        # Values for keys, in order. Missing keys are fetched with one fetch_many(missing) call,
+        # which returns {key: value}; keys another caller is already fetching are waited on
+        # instead, so concurrent sessions asking for the same key make one upstream request.
+        # A fetch error is raised to every caller waiting on it
+        values = {}
+        claimed = {}
+        waiting = {}
+        with self._lock:
+            now = time.time()
+            for key in dict.fromkeys(keys):
+                value = self._lookup(namespace, key, now)
+                if value is not None:
+                    values[key] = value
+                elif (namespace, key) in self._in_flight:
+                    waiting[key] = self._in_flight[(namespace, key)]
+                else:
+                    claimed[key] = self._in_flight[(namespace, key)] = Future()
+            self.hits[namespace] = self.hits.get(namespace, 0) + len(values)
+            self.misses[namespace] = self.misses.get(namespace, 0) + len(claimed)
+            self.coalesced[namespace] = self.coalesced.get(namespace, 0) + len(waiting)
+
+        if claimed:
+            try:
+                fetched = fetch_many(list(claimed)) or {}
+                for key, value in fetched.items():
+                    if value is not None and key in claimed:
+                        self.set(namespace, key, value)
+            except BaseException as e:
+                for future in claimed.values():
+                    future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    for key in claimed:
+                        self._in_flight.pop((namespace, key), None)
+            for key, future in claimed.items():
+                future.set_result(fetched.get(key))
+                values[key] = fetched.get(key)
+
+        for key, future in waiting.items():
+            values[key] = future.result()
+        return [values.get(key) for key in keys]
+
+    def get_or_fetch(self, namespace, key, fetch):
+        # Single-key form of get_many_or_fetch; a None from fetch() is returned but not cached
+        return self.get_many_or_fetch(namespace, [key], lambda _: {key: fetch()})[0]
+
+    def set(self, namespace, key, value):
+        now = time.time()
+        payload = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._remember(namespace, key, value, now, now)
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (namespace, key, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, payload, len(payload), now, now)
+            )
+            self._size += len(payload) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Drop least recently used entries until the cache is back under budget
+        rows = self._conn.execute(
+            "SELECT namespace, key, size FROM responses ORDER BY accessed"
+        )
+        doomed = []
+        for namespace, key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            doomed.append((namespace, key))
+            self._size -= size
+        self._conn.executemany("DELETE FROM responses WHERE namespace = ? AND key = ?", doomed)
+
+    def keys(self, namespace):
+        # Keys that are still fresh, for lookups that cannot be done by exact key
+        cutoff = time.time() - self.ttls.get(namespace, DEFAULT_TTL)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM responses WHERE namespace = ? AND created >= ?",
+                (namespace, cutoff)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def values(self, namespace):
+        # Every fresh value in a namespace, without counting hits or touching access times
+        cutoff = time.time() - self.ttls.get(namespace, DEFAULT_TTL)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value FROM responses WHERE namespace = ? AND created >= ?",
+                (namespace, cutoff)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for namespace, ttl in self.ttls.items():
+                self._conn.execute(
+                    "DELETE FROM responses WHERE namespace = ? AND created < ?",
+                    (namespace, now - ttl)
+                )
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._memory.clear()
+            self._memory_size = 0
+
+    def memory_stats(self):
+        # Occupancy of the in-memory layer
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "bytes": self._memory_size,
+                "max_bytes": self.memory_max_bytes,
+                "evictions": self.memory_evictions,
+                "in_flight": len(self._in_flight),
+            }
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, COUNT(*), SUM(size) FROM responses GROUP BY namespace"
+            ).fetchall()
+        namespaces = {row[0] for row in rows} | set(self.hits) | set(self.misses)
+        with self._lock:
+            memory = {}
+            for (namespace, _), (_, size, _, _) in self._memory.items():
+                memory[namespace] = memory.get(namespace, 0) + size
+        entries = {row[0]: (row[1], row[2]) for row in rows}
+        return {
+            namespace: {
+                "hits": self.hits.get(namespace, 0),
+                "memory_hits": self.memory_hits.get(namespace, 0),
+                "misses": self.misses.get(namespace, 0),
+                "coalesced": self.coalesced.get(namespace, 0),
+                "entries": entries.get(namespace, (0, 0))[0],
+                "bytes": entries.get(namespace, (0, 0))[1],
+                "memory_bytes": memory.get(namespace, 0),
+            }
+            for namespace in sorted(namespaces)
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    # One cache per process, shared by every Streamlit session
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,141 @@
+import base64
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+from cache import content_hash, get_cache
+from http_client import get_client
+from telemetry import bind, span
+from imageprep import PHASH_DISTANCE, hash_distance
+from ingredients import CONCEPT_THRESHOLD, MAX_INGREDIENTS, select_ingredients
+
+# Load API key
+load_dotenv()
+CLARIFAI_API_KEY = os.getenv("CLARIFAI_API_KEY")
+
+BASE_URL = os.getenv("CLARIFAI_BASE_URL", "https://api.clarifai.com").rstrip("/")
+MODEL_URL = f"{BASE_URL}/v2/models/food-item-recognition/outputs"
+# Images per predict request, and how many requests may be in flight at once
+BATCH_SIZE = 32
+MAX_BATCH_WORKERS = 4
+
+
+class ClarifaiError(Exception):
+    def __init__(self, status_code, text):
+        super().__init__(f"Clarifai API error: {status_code} {text}" if status_code else f"Clarifai API error: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def find_similar_concepts(phash, max_distance=PHASH_DISTANCE):
+    # Concepts of an earlier upload that looks the same, e.g. a re-saved or re-sized copy
+    cache = get_cache()
+    best = None
+    for key in cache.keys("clarifai_phash"):
+        distance = hash_distance(phash, key)
+        if distance <= max_distance and (best is None or distance < best[0]):
+            best = (distance, key)
+    if best is None:
+        return None
+    return cache.get("clarifai_phash", best[1])
+
+
+def _post_inputs(images):
+    # One request for a chunk of images; outputs come back in input order
+    headers = {
+        "Authorization": f"Key {CLARIFAI_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    with span("clarifai.base64", images=len(images), bytes=sum(len(image_bytes) for image_bytes in images)):
+        data = {
+            "inputs": [
+                {
+                    "data": {
+                        "image": {
+                            "base64": base64.b64encode(image_bytes).decode('utf-8')
+                        }
+                    }
+                }
+                for image_bytes in images
+            ]
+        }
+    try:
+        response = get_client().post(MODEL_URL, "clarifai", headers=headers, json=data)
+    except requests.RequestException as e:
+        raise ClarifaiError(None, str(e)) from e
+    if response.status_code != 200:
+        raise ClarifaiError(response.status_code, response.text)
+    return [
+        [{"name": concept["name"], "value": concept["value"]} for concept in output["data"].get("concepts", [])]
+        for output in response.json()["outputs"]
+    ]
+
+
+def predict_concepts_batch(images, phashes=None, batch_size=BATCH_SIZE, max_workers=MAX_BATCH_WORKERS):
+    # Raw concepts for each image, in order. Cached images are skipped, the rest go
+    # to Clarifai in chunks of batch_size inputs, with the chunks sent concurrently
+    images = list(images)
+    phashes = list(phashes or [None] * len(images))
+    keys = [content_hash(image_bytes) for image_bytes in images]
+    image_by_key = dict(zip(keys, images))
+    phash_by_key = dict(zip(keys, phashes))
+    with span("clarifai.predict", images=len(images)) as record:
+        record["cached"] = len(images)
+
+        def fetch(missing):
+            cache = get_cache()
+            results = {}
+            # Near-identical earlier uploads, e.g. a re-saved or re-sized copy, need no request
+            for key in missing:
+                if phash_by_key[key]:
+                    concepts = find_similar_concepts(phash_by_key[key])
+                    if concepts is not None:
+                        results[key] = concepts
+            pending = [key for key in missing if key not in results]
+            record["cached"] = len(images) - len(pending)
+            if not pending:
+                return results
+
+            chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            workers = max(1, min(max_workers, len(chunks)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                outputs = list(pool.map(bind(lambda chunk: _post_inputs([image_by_key[key] for key in chunk])), chunks))
+            for chunk, chunk_outputs in zip(chunks, outputs):
+                for key, concepts in zip(chunk, chunk_outputs):
+                    results[key] = concepts
+                    if phash_by_key[key]:
+                        cache.set("clarifai_phash", phash_by_key[key], concepts)
+            return results
+
+        # Sessions uploading the same photo at once share one request for it
+        return get_cache().get_many_or_fetch("clarifai", keys, fetch)
+
+
+def predict_concepts(image_bytes, phash=None):
+    # Raw concepts for one image, cached by the image content hash and,
+    # when given, reused from any upload with a near-identical perceptual hash
+    return predict_concepts_batch([image_bytes], [phash])[0]
+
+
+def merge_concepts(per_image):
+    # Combine concepts seen across several photos. Confidences are merged as
+    # 1 - prod(1 - value), so an ingredient seen in more than one photo scores higher
+    missing = {}
+    for concepts in per_image:
+        for concept in concepts:
+            name = concept["name"]
+            missing[name] = missing.get(name, 1.0) * (1.0 - concept["value"])
+    merged = [{"name": name, "value": 1.0 - value} for name, value in missing.items()]
+    return sorted(merged, key=lambda concept: concept["value"], reverse=True)
+
+
+def detect_ingredients(image_bytes, threshold=CONCEPT_THRESHOLD, phash=None, top_k=MAX_INGREDIENTS):
+    concepts = predict_concepts(image_bytes, phash=phash)
+    return select_ingredients(concepts, threshold, top_k)
+
+
+def detect_ingredients_batch(images, threshold=CONCEPT_THRESHOLD, phashes=None, top_k=MAX_INGREDIENTS):
+    concepts = merge_concepts(predict_concepts_batch(images, phashes))
+    return select_ingredients(concepts, threshold, top_k)
@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from recipe_model import SCHEMA_VERSION, Recipe
+
+FAVORITES_PATH = os.getenv("FAVORITES_PATH", "favorites.sqlite")
+# Old rewrite-the-whole-file store, imported once on first open
+LEGACY_FAVORITES_PATH = "favorites.json"
+
+PAGE_SIZE = 20
+
+
+class FavoritesStore:
+    def __init__(self, path=FAVORITES_PATH, legacy_path=LEGACY_FAVORITES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # SQLite's file locking keeps several server processes from corrupting the store
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS favorites ("
+            " id INTEGER PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " added REAL NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS favorites_added ON favorites (added)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.upgrade_records()
+        if legacy_path:
+            self.migrate_from_json(legacy_path)
+
+    def _row(self, recipe, added):
+        return (recipe.id, recipe.title, added, json.dumps(recipe.to_record(), separators=(",", ":")))
+
+    def _recipe(self, payload):
+        return Recipe.from_record(json.loads(payload))
+
+    def add(self, recipe):
+        # True if the recipe was added, False if it was already a favorite
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO favorites (id, title, added, payload) VALUES (?, ?, ?, ?)",
+                self._row(recipe, time.time())
+            )
+        return cursor.rowcount == 1
+
+    def add_many(self, recipes):
+        # Adds every recipe in one transaction and returns the ids that were new
+        now = time.time()
+        added = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for recipe in recipes:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO favorites (id, title, added, payload) VALUES (?, ?, ?, ?)",
+                        self._row(recipe, now)
+                    )
+                    if cursor.rowcount == 1:
+                        added.append(recipe.id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def remove(self, recipe_id):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM favorites WHERE id = ?", (recipe_id,))
+        return cursor.rowcount == 1
+
+    def contains(self, recipe_id):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM favorites WHERE id = ?", (recipe_id,)).fetchone()
+        return row is not None
+
+    def get(self, recipe_id):
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM favorites WHERE id = ?", (recipe_id,)).fetchone()
+        return self._recipe(row[0]) if row else None
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM favorites").fetchone()[0]
+
+    def titles(self, offset=0, limit=PAGE_SIZE):
+        # (id, title) pairs, newest first, without loading the recipe payloads
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, title FROM favorites ORDER BY added DESC, id LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+
+    def list(self, offset=0, limit=PAGE_SIZE):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM favorites ORDER BY added DESC, id LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return [self._recipe(row[0]) for row in rows]
+
+    def iter_all(self, page_size=PAGE_SIZE):
+        # Every favorite, one page at a time
+        offset = 0
+        while True:
+            page = self.list(offset, page_size)
+            if not page:
+                return
+            yield from page
+            offset += len(page)
+
+    def compact(self):
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+
+    def upgrade_records(self):
+        # Rewrites rows stored as full payloads or an older schema as compact records
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row and int(row[0]) == SCHEMA_VERSION:
+                return 0
+            rows = self._conn.execute("SELECT id, payload FROM favorites").fetchall()
+        updates = []
+        for recipe_id, payload in rows:
+            record = json.loads(payload)
+            if isinstance(record, list) and record[0] == SCHEMA_VERSION:
+                continue
+            updates.append((json.dumps(self._recipe(payload).to_record(), separators=(",", ":")), recipe_id))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("UPDATE favorites SET payload = ? WHERE id = ?", updates)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)", (str(SCHEMA_VERSION),)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if updates:
+            self.compact()
+        return len(updates)
+
+    def migrate_from_json(self, legacy_path):
+        # One-time import of the old favorites.json; the file itself is left in place
+        key = f"migrated:{os.path.abspath(legacy_path)}"
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone()
+        if done or not os.path.exists(legacy_path):
+            return 0
+        with open(legacy_path, "r") as f:
+            favorites = json.load(f)
+        added = len(self.add_many(Recipe.from_payload(recipe) for recipe in favorites))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+        return added
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FavoritesStore()
+        return _store
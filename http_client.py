@@ -0,0 +1,228 @@
+import datetime
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from telemetry import span
+
+# (connect, read) timeouts in seconds per upstream
+TIMEOUTS = {
+    "clarifai": (3.05, 30),
+    "spoonacular": (3.05, 10),
+    "image": (3.05, 10),
+}
+DEFAULT_TIMEOUT = (3.05, 10)
+
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Consecutive failures that open an upstream's circuit, and how long it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+# Spoonacular requests per second while plenty of daily quota is left
+SPOONACULAR_RATE = float(os.getenv("SPOONACULAR_RATE", "5"))
+SPOONACULAR_BURST = 10
+# Daily points held back so the key never gets locked out
+SPOONACULAR_QUOTA_RESERVE = float(os.getenv("SPOONACULAR_QUOTA_RESERVE", "5"))
+# Below this share of the daily quota, the remaining points are spread until the reset
+SPOONACULAR_LOW_WATER = 0.1
+# Longest a caller waits for a token before giving up
+MAX_THROTTLE_WAIT = 10.0
+
+POOL_SIZE = 20
+
+# Response headers copied into telemetry records
+QUOTA_HEADERS = {
+    "X-API-Quota-Request": "quota_request",
+    "X-API-Quota-Used": "quota_used",
+    "X-API-Quota-Left": "quota_left",
+}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+class QuotaExhaustedError(requests.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        # While open, requests fail fast; after the cooldown one trial request is let through
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+
+
+class QuotaBucket:
+    # Token bucket fed by Spoonacular's quota headers. Once the points left today drop
+    # below the low-water mark they are spread over the time until the UTC midnight reset
+
+    def __init__(self, rate=SPOONACULAR_RATE, burst=SPOONACULAR_BURST, reserve=SPOONACULAR_QUOTA_RESERVE):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.tokens = float(burst)
+        self.quota_used = None
+        self.quota_left = None
+        # Wall-clock time (UTC) the daily quota next resets
+        self.resets_at = None
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, cost=1.0, max_wait=MAX_THROTTLE_WAIT):
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                if self.resets_at is not None and time.time() >= self.resets_at:
+                    # A new day: the old counts no longer apply until the next response
+                    self.quota_used = None
+                    self.quota_left = None
+                    self.resets_at = None
+                    self.rate = self.base_rate
+                if self.quota_left is not None and self.quota_left - cost < self.reserve:
+                    raise QuotaExhaustedError(f"Spoonacular quota nearly exhausted ({self.quota_left:g} points left)")
+                self._refill()
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                wait = (cost - self.tokens) / self.rate if self.rate > 0 else max_wait
+            if time.monotonic() + wait > deadline:
+                raise QuotaExhaustedError("Spoonacular rate limit: no request budget left")
+            time.sleep(wait)
+
+    def update(self, headers):
+        used = headers.get("X-API-Quota-Used")
+        left = headers.get("X-API-Quota-Left")
+        if left is None:
+            return
+        with self._lock:
+            self._refill()
+            self.quota_left = float(left)
+            if used is not None:
+                self.quota_used = float(used)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            midnight = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            self.resets_at = midnight.timestamp()
+            seconds_left = max(1.0, (midnight - now).total_seconds())
+            spendable = max(0.0, self.quota_left - self.reserve)
+            daily = self.quota_left + (self.quota_used or 0.0)
+            if spendable <= daily * SPOONACULAR_LOW_WATER:
+                self.rate = min(self.base_rate, spendable / seconds_left)
+            else:
+                self.rate = self.base_rate
+            self.tokens = min(self.tokens, spendable)
+
+
+class HttpClient:
+    def __init__(self, pool_size=POOL_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(TIMEOUTS), pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.breakers = {endpoint: CircuitBreaker() for endpoint in TIMEOUTS}
+        self.quota = QuotaBucket()
+        # Requests actually sent, per upstream, including retries
+        self.request_counts = {}
+        self._count_lock = threading.Lock()
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(BACKOFF_CAP, float(retry_after))
+        # Full jitter: a random wait up to the exponential bound
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+    def request(self, method, url, endpoint, **kwargs):
+        breaker = self.breakers.setdefault(endpoint, CircuitBreaker())
+        kwargs.setdefault("timeout", TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+
+        for attempt in range(MAX_RETRIES + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(f"{endpoint} is unavailable, retrying in {breaker.cooldown:g}s")
+            if endpoint == "spoonacular":
+                self.quota.acquire()
+            with self._count_lock:
+                self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+            try:
+                with span(f"http.{endpoint}", method=method, path=url.split("?")[0], attempt=attempt) as record:
+                    response = self.session.request(method, url, **kwargs)
+                    record["status"] = response.status_code
+                    record["response_bytes"] = len(response.content)
+                    if response.request is not None and response.request.body:
+                        record["request_bytes"] = len(response.request.body)
+                    for header, field in QUOTA_HEADERS.items():
+                        if header in response.headers:
+                            record[field] = float(response.headers[header])
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record(False)
+                if attempt == MAX_RETRIES:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if endpoint == "spoonacular":
+                self.quota.update(response.headers)
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record(True)
+                return response
+            breaker.record(False)
+            if attempt == MAX_RETRIES:
+                return response
+            time.sleep(self._backoff(attempt, response))
+
+    def get(self, url, endpoint, **kwargs):
+        return self.request("GET", url, endpoint, **kwargs)
+
+    def post(self, url, endpoint, **kwargs):
+        return self.request("POST", url, endpoint, **kwargs)
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    # One pooled client per process; forked PDF workers get their own connections
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = HttpClient()
+            _client_pid = os.getpid()
+        return _client
@@ -0,0 +1,158 @@
+import io
+import os
+import re
+import threading
+
+from cache import content_hash
+from http_client import get_client
+from telemetry import span
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(".cache", "images"))
+# Total size of cached variants before the least recently used are deleted
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Variant name -> (width in px, JPEG quality). Every variant is made from one download
+VARIANTS = {
+    "thumb": (150, 80),
+    "pdf": (556, 85),
+}
+
+# Spoonacular serves each recipe image in several sizes; all of them map to the largest
+_SPOONACULAR_SIZE = re.compile(r"^(https://img\.spoonacular\.com/recipes/\d+)-\d+x\d+(\.\w+)$")
+SOURCE_SIZE = "556x370"
+# Longest a caller waits for another thread's download of the same image
+DOWNLOAD_WAIT_SECONDS = 60
+
+_lock = threading.Lock()
+_fetching = {}
+_total_bytes = None
+
+
+def _reset_after_fork():
+    # A forked PDF worker must not wait on downloads running in the parent, nor on its lock
+    global _lock, _fetching
+    _lock = threading.Lock()
+    _fetching = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def source_url(url):
+    return _SPOONACULAR_SIZE.sub(rf"\1-{SOURCE_SIZE}\2", url)
+
+
+def _variant_path(url, variant):
+    return os.path.join(IMAGE_CACHE_DIR, variant, content_hash(source_url(url)) + ".jpg")
+
+
+def cached_path(url, variant):
+    # Path of the variant if it is already on disk, marking it recently used; never downloads
+    path = _variant_path(url, variant)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def _cache_size():
+    # Caller holds the lock; measured once per process, then tracked as files are written
+    global _total_bytes
+    if _total_bytes is None:
+        _total_bytes = sum(entry.stat().st_size for entry in _entries())
+    return _total_bytes
+
+
+def _entries():
+    for variant in VARIANTS:
+        directory = os.path.join(IMAGE_CACHE_DIR, variant)
+        if os.path.isdir(directory):
+            yield from (entry for entry in os.scandir(directory) if entry.name.endswith(".jpg"))
+
+
+def _evict(keep=()):
+    # Caller holds the lock; deletes least recently used files, other than keep, until back
+    # under budget. Re-measures first, since other processes share the directory
+    global _total_bytes
+    entries = sorted(_entries(), key=lambda entry: entry.stat().st_mtime)
+    _total_bytes = sum(entry.stat().st_size for entry in entries)
+    for entry in entries:
+        if _total_bytes <= IMAGE_CACHE_MAX_BYTES:
+            break
+        if entry.path in keep:
+            continue
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+        except OSError:
+            continue
+        _total_bytes -= size
+
+
+def _download(url):
+    # One download, resized into every variant
+    global _total_bytes
+    from PIL import Image
+
+    from imageprep import to_rgb
+
+    with _lock:
+        # Measure before writing, so the first scan does not count these files twice
+        _cache_size()
+    with span("image.fetch", variants=len(VARIANTS)) as record:
+        res = get_client().get(source_url(url), "image")
+        res.raise_for_status()
+        record["bytes"] = len(res.content)
+        image = to_rgb(Image.open(io.BytesIO(res.content)))
+        written = 0
+        paths = []
+        for variant, (width, quality) in VARIANTS.items():
+            resized = image
+            if image.width > width:
+                resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            path = _variant_path(url, variant)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Baseline JPEG: fpdf cannot embed progressive ones
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            resized.save(tmp_path, format="JPEG", quality=quality, optimize=True)
+            written += os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+            paths.append(path)
+    with _lock:
+        _total_bytes += written
+        if _total_bytes > IMAGE_CACHE_MAX_BYTES:
+            _evict(keep=paths)
+
+
+def get_image_path(url, variant="thumb"):
+    # Local path of a resized recipe image; downloads it the first time. Concurrent
+    # callers for the same image wait for one download
+    path = cached_path(url, variant)
+    if path:
+        return path
+    key = source_url(url)
+    with _lock:
+        event = _fetching.get(key)
+        leader = event is None
+        if leader:
+            event = _fetching[key] = threading.Event()
+    if leader:
+        try:
+            _download(url)
+        finally:
+            with _lock:
+                del _fetching[key]
+            event.set()
+    else:
+        event.wait(DOWNLOAD_WAIT_SECONDS)
+    path = cached_path(url, variant)
+    if path is None:
+        raise OSError(f"Image {url} could not be cached")
+    return path
+
+
+def cache_stats():
+    with _lock:
+        return {"files": sum(1 for _ in _entries()), "bytes": _cache_size(), "max_bytes": IMAGE_CACHE_MAX_BYTES}
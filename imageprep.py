@@ -0,0 +1,64 @@
+import io
+import os
+
+from PIL import Image, ImageOps
+
+from telemetry import span
+
+# Longest side and JPEG quality of the image sent to Clarifai
+MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1024"))
+JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+# Perceptual hashes at most this many bits apart count as the same photo
+PHASH_DISTANCE = int(os.getenv("IMAGE_PHASH_DISTANCE", "6"))
+
+
+def to_rgb(image):
+    # JPEG has no alpha channel, so flatten transparency onto white
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    if image.mode != "RGB":
+        return image.convert("RGB")
+    return image
+
+
+def perceptual_hash(image):
+    # 64-bit difference hash: compares neighbouring pixels of a 9x8 grayscale thumbnail
+    pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def hash_distance(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def prepare_image(data, max_dimension=MAX_DIMENSION, quality=JPEG_QUALITY):
+    with span("image.decode", bytes=len(data)) as record:
+        image = Image.open(io.BytesIO(data))
+        original_size = image.size
+        # For JPEGs, let the decoder downscale by a power of two instead of decoding every pixel
+        image.draft("RGB", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image = to_rgb(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        record["pixels"] = original_size[0] * original_size[1]
+
+    with span("image.encode") as record:
+        buffered = io.BytesIO()
+        image.save(buffered, format="JPEG", quality=quality, optimize=True)
+        record["bytes"] = buffered.tell()
+    return {
+        "bytes": buffered.getvalue(),
+        "size": image.size,
+        "original_size": original_size,
+        "original_bytes": len(data),
+        "phash": perceptual_hash(image),
+    }
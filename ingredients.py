@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+
+from cache import get_cache
+
+# Detected concepts kept as query ingredients: minimum confidence, and at most this many
+CONCEPT_THRESHOLD = float(os.getenv("INGREDIENT_THRESHOLD", 0.85))
+MAX_INGREDIENTS = int(os.getenv("INGREDIENT_TOP_K", 8))
+# A cached search whose ingredient set is at least this similar (Jaccard) answers a new one
+QUERY_SIMILARITY = float(os.getenv("QUERY_SIMILARITY", 0.8))
+
+# Regional and alternate names, mapped to the name Spoonacular uses
+SYNONYMS = {
+    "aubergine": "eggplant",
+    "beetroot": "beet",
+    "capsicum": "bell pepper",
+    "coriander": "cilantro",
+    "courgette": "zucchini",
+    "garbanzo": "chickpea",
+    "garbanzo bean": "chickpea",
+    "maize": "corn",
+    "prawn": "shrimp",
+    "rocket": "arugula",
+    "scallion": "green onion",
+    "spring onion": "green onion",
+    "sweetcorn": "corn",
+}
+# Concepts the food model reports that are categories, not ingredients
+NOT_INGREDIENTS = {"dish", "food", "fruit", "meal", "meat", "produce", "vegetable"}
+# Words ending in s that are not plurals, or whose plural is its own ingredient
+SINGULAR_S = {"greens", "grits", "molasses", "oats", "swiss"}
+# Singulars ending in -ie, whose plural would otherwise become -y ("cookies" -> "cooky")
+SINGULAR_IE = {"brownie", "calorie", "cookie", "hoagie", "pie", "pierogie", "smoothie", "veggie"}
+# Plurals the suffix rules get wrong
+IRREGULAR_PLURALS = {"chilies": "chili", "halves": "half", "leaves": "leaf", "loaves": "loaf"}
+# Plurals in -ches/-shes that drop -es; others keep their e ("quiches" -> "quiche")
+ES_PLURALS = {"dishes", "peaches", "radishes", "sandwiches", "squashes"}
+
+
+def singular(name):
+    # Naive singular form, so "tomatoes" and "tomato" share a key
+    head, _, last = name.rpartition(" ")
+    if last in IRREGULAR_PLURALS:
+        last = IRREGULAR_PLURALS[last]
+    elif last in SINGULAR_S or last.endswith("us") or last.endswith("ss"):
+        # asparagus, couscous, octopus, hummus, watercress...
+        pass
+    elif last.endswith("ies") and last[:-1] in SINGULAR_IE:
+        last = last[:-1]
+    elif last.endswith("oes") or last in ES_PLURALS:
+        last = last[:-2]
+    elif last.endswith("ies") and len(last) > 4:
+        last = last[:-3] + "y"
+    elif last.endswith("s") and len(last) > 3:
+        last = last[:-1]
+    return f"{head} {last}" if head else last
+
+
+def canonical_ingredient(name):
+    name = singular(" ".join(name.lower().replace("-", " ").split()))
+    return SYNONYMS.get(name, name)
+
+
+def query_name(name):
+    # Name sent to Spoonacular: cleaned up and with synonyms mapped, but not singularized,
+    # since its own matching handles plurals better than singular() does
+    name = " ".join(name.lower().replace("-", " ").split())
+    return SYNONYMS.get(name) or SYNONYMS.get(singular(name)) or name
+
+
+def query_names(names):
+    # Names for the upstream query of the same ingredients canonicalize(names) keys
+    kept = {query_name(name) for name in names if canonical_ingredient(name) not in NOT_INGREDIENTS}
+    return sorted(name for name in kept if name)
+
+
+def canonicalize(names):
+    # Sorted, de-duplicated canonical names, so equivalent queries get the same key
+    canonical = {canonical_ingredient(name) for name in names}
+    return sorted(name for name in canonical if name and name not in NOT_INGREDIENTS)
+
+
+def select_ingredients(concepts, threshold=CONCEPT_THRESHOLD, top_k=MAX_INGREDIENTS):
+    # The top_k most confident concepts above threshold, one per canonical ingredient, as
+    # query names; searches canonicalize them for their keys
+    selected = {}
+    for concept in sorted(concepts, key=lambda concept: concept["value"], reverse=True):
+        if concept["value"] <= threshold or len(selected) >= top_k:
+            break
+        key = canonical_ingredient(concept["name"])
+        if key not in selected and key not in NOT_INGREDIENTS:
+            selected[key] = query_name(concept["name"])
+    return sorted(selected.values())
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class QueryIndex:
+    # Ingredient sets of earlier findByIngredients searches, by cache key, with an inverted
+    # index from ingredient to search so only searches sharing an ingredient are compared
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._by_ingredient = {}
+
+    def __len__(self):
+        return len(self._queries)
+
+    def add(self, key, ingredients, number, ranking):
+        ingredients = frozenset(ingredients)
+        with self._lock:
+            if key in self._queries:
+                return
+            self._queries[key] = (ingredients, number, ranking)
+            for name in ingredients:
+                self._by_ingredient.setdefault(name, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            ingredients, _, _ = self._queries.pop(key, ((), None, None))
+            for name in ingredients:
+                self._by_ingredient[name].discard(key)
+
+    def similar(self, ingredients, number, ranking, min_similarity=QUERY_SIMILARITY):
+        # Cache keys of earlier searches with the same ranking, at least as many results and
+        # an ingredient set at least min_similarity alike, most similar first
+        ingredients = frozenset(ingredients)
+        with self._lock:
+            candidates = set()
+            for name in ingredients:
+                candidates |= self._by_ingredient.get(name, set())
+            scored = []
+            for key in candidates:
+                other, other_number, other_ranking = self._queries[key]
+                if other_ranking == ranking and other_number >= number:
+                    similarity = jaccard(ingredients, other)
+                    if similarity >= min_similarity:
+                        scored.append((similarity, key))
+        return [key for _, key in sorted(scored, reverse=True)]
+
+
+_queries = None
+_queries_lock = threading.Lock()
+
+
+def get_query_index():
+    # Built once per process from the searches already in the response cache
+    global _queries
+    with _queries_lock:
+        if _queries is None:
+            _queries = QueryIndex()
+            for key in get_cache().keys("find"):
+                # cache.ingredients_key stores [ingredients, number, ranking] as JSON
+                ingredients, number, ranking = json.loads(key)
+                _queries.add(key, canonicalize(ingredients), number, ranking)
+        return _queries
@@ -0,0 +1,132 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from telemetry import bind, span
+
+# Threads running slow side effects (PDF rendering, favorites writes) for every session
+JOB_WORKERS = 4
+# Finished jobs whose status and result are kept for polling
+MAX_FINISHED_JOBS = 256
+# Seconds a batch waits for more items before it is written
+BATCH_DELAY = 0.05
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._lock = threading.Lock()
+        # job id -> status dict, oldest first
+        self._jobs = OrderedDict()
+        self._futures = {}
+        # De-duplication key -> job id, so a rerun does not queue the same work twice
+        self._by_key = {}
+        # Batch kind -> (job id, items) for the batch still collecting items
+        self._batches = {}
+
+    def _submit(self, kind, fn, args, key=None):
+        # Caller holds the lock
+        job_id = uuid.uuid4().hex[:12]
+        self._jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "key": key,
+            "state": "queued",
+            "created": time.time(),
+            "finished": None,
+            "result": None,
+            "error": None,
+        }
+        if key is not None:
+            self._by_key[key] = job_id
+        self._futures[job_id] = self._pool.submit(bind(self._run), job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["state"] = "running"
+        try:
+            with span(f"job.{job['kind']}"):
+                result = fn(*args)
+        except Exception as e:
+            with self._lock:
+                job.update(state="failed", error=str(e), finished=time.time())
+                self._prune()
+            raise
+        with self._lock:
+            job.update(state="done", result=result, finished=time.time())
+            self._prune()
+        return result
+
+    def _prune(self):
+        # Caller holds the lock; drops the oldest finished jobs beyond max_finished
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished"] is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            job = self._jobs.pop(job_id)
+            self._futures.pop(job_id, None)
+            if self._by_key.get(job["key"]) == job_id:
+                del self._by_key[job["key"]]
+
+    def submit(self, kind, fn, *args, key=None):
+        # Runs fn(*args) on a worker and returns the job id. With a key, a job for the same
+        # key that is queued, running or done is reused; a failed one is retried
+        with self._lock:
+            job_id = self._by_key.get(key) if key is not None else None
+            if job_id is not None and self._jobs[job_id]["state"] != "failed":
+                return job_id
+            return self._submit(kind, fn, args, key)
+
+    def submit_batch(self, kind, fn, item):
+        # Queues item for fn(items). Items submitted before the batch starts share one
+        # job, so a burst of writes becomes one call; returns that job's id
+        with self._lock:
+            batch = self._batches.get(kind)
+            if batch is None:
+                batch = (self._submit(kind, self._flush, (kind, fn)), [])
+                self._batches[kind] = batch
+            batch[1].append(item)
+            return batch[0]
+
+    def _flush(self, kind, fn):
+        time.sleep(BATCH_DELAY)
+        with self._lock:
+            _, items = self._batches.pop(kind)
+        return fn(items)
+
+    def status(self, job_id):
+        # Copy of the job's status dict, or None once it has been pruned
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None):
+        # The job's result, blocking until it finishes; re-raises its error
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is None:
+            raise KeyError(job_id)
+        return future.result(timeout)
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["state"]] = counts.get(job["state"], 0) + 1
+            return counts
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    # One queue per process, shared by every Streamlit session
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
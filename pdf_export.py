@@ -0,0 +1,145 @@
+import io
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cache import content_hash
+from image_cache import get_image_path
+from telemetry import span
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(".cache", "pdf"))
+# Total size of cached PDFs before the least recently used are deleted
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Cookbooks with fewer recipes than this are rendered in-process
+MIN_PARALLEL_RECIPES = 4
+
+_HTML_TAG = re.compile('<[^<]+?>')
+
+
+def _latin1(text):
+    # The core FPDF fonts only cover latin-1
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+def _render(recipe):
+    # Imported here so only processes that actually render pay for fpdf
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=16, style='B')
+    pdf.cell(200, 10, txt=_latin1(recipe.title), ln=True, align='C')
+    pdf.ln(10)
+
+    # Add recipe image if available
+    if recipe.image:
+        try:
+            pdf.image(get_image_path(recipe.image, "pdf"), x=50, w=110)
+        except Exception:
+            pass
+
+    pdf.ln(10)
+    pdf.set_font("Arial", style='B', size=14)
+    pdf.cell(200, 10, txt="Ingredients:", ln=True)
+    pdf.set_font("Arial", size=12)
+    for ing in recipe.ingredients:
+        pdf.multi_cell(0, 10, _latin1(f"- {ing.original or 'Ingredient details missing'}"))
+
+    pdf.ln(10)
+    pdf.set_font("Arial", style='B', size=14)
+    pdf.cell(200, 10, txt="Instructions:", ln=True)
+    pdf.set_font("Arial", size=12)
+    if recipe.instructions:
+        # Clean HTML tags from instructions
+        clean_instructions = _HTML_TAG.sub('', recipe.instructions)
+        pdf.multi_cell(0, 10, _latin1(clean_instructions))
+    else:
+        pdf.multi_cell(0, 10, "No instructions available.")
+
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def _pdf_path(recipe):
+    # Keyed by id and by the fields that are rendered, so edited recipes re-render
+    rendered = [recipe.title, recipe.image, [ing.original for ing in recipe.ingredients], recipe.instructions]
+    digest = content_hash(json.dumps(rendered))[:16]
+    return os.path.join(PDF_CACHE_DIR, f"{recipe.id}-{digest}.pdf")
+
+
+def _evict(keep):
+    # Deletes least recently used PDFs, other than keep, until back under budget. Scans the
+    # directory each time, since renders in worker processes write to it too
+    try:
+        entries = [entry for entry in os.scandir(PDF_CACHE_DIR) if entry.name.endswith(".pdf")]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    total = sum(entry.stat().st_size for entry in entries)
+    for entry in entries:
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        if entry.path == keep:
+            continue
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+        except OSError:
+            continue
+        total -= size
+
+
+def create_recipe_pdf(recipe):
+    with span("pdf.render", recipe_id=recipe.id) as record:
+        path = _pdf_path(recipe)
+        try:
+            # Marks it recently used for _evict
+            os.utime(path)
+            record["cache"] = "hit"
+        except OSError:
+            record["cache"] = "miss"
+        if record["cache"] == "hit":
+            with open(path, "rb") as f:
+                return f.read()
+
+        pdf_bytes = _render(recipe)
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+        _evict(keep=path)
+        record["bytes"] = len(pdf_bytes)
+        return pdf_bytes
+
+
+def create_cookbook_pdf(recipes, progress=None, max_workers=None):
+    # One PDF with a section per recipe. Recipes are rendered in a process pool
+    # and merged in their original order; progress(done, total) is called as each finishes
+    recipes = list(recipes)
+    total = len(recipes)
+    pages = [None] * total
+
+    if total < MIN_PARALLEL_RECIPES:
+        for i, recipe in enumerate(recipes):
+            pages[i] = create_recipe_pdf(recipe)
+            if progress:
+                progress(i + 1, total)
+    else:
+        # forkserver: a fork of the threaded server could copy a lock some other thread holds
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("forkserver")) as pool:
+            futures = {pool.submit(create_recipe_pdf, recipe): i for i, recipe in enumerate(recipes)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                pages[futures[future]] = future.result()
+                if progress:
+                    progress(done, total)
+
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for page in pages:
+        writer.append(PdfReader(io.BytesIO(page)))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
@@ -0,0 +1,107 @@
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import get_cache, ingredients_key
+from clarifai import detect_ingredients_batch
+from imageprep import prepare_image
+from ingredients import canonicalize, get_query_index
+from recipe_index import get_index
+from recipe_model import Recipe
+from spoonacular import SpoonacularError, find_by_ingredients, get_recipe_information, get_recipes_information
+from telemetry import bind, span
+
+# Number of recipe suggestions to return
+RECIPE_COUNT = 5
+# A local match must use at least this share of the query ingredients
+LOCAL_MIN_USED = 0.5
+# Threads fetching recipe details ahead of the user
+PREFETCH_WORKERS = 4
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_prefetching = {}
+_prefetch_lock = threading.Lock()
+
+
+def prepare_uploads(uploads):
+    # Decoded, downscaled copies of raw image uploads, ready for detect_ingredients
+    return [prepare_image(data) for data in uploads]
+
+
+def detect_ingredients(prepared):
+    # Ingredients seen across the prepared uploads; raises ClarifaiError
+    return detect_ingredients_batch([image["bytes"] for image in prepared], phashes=[image["phash"] for image in prepared])
+
+
+def similar_cached_summaries(ingredients, number=RECIPE_COUNT, ranking=1):
+    # Results of an earlier search for a nearly identical ingredient set, if still cached
+    queries = get_query_index()
+    with span("query.similar", ingredients=len(ingredients)) as record:
+        for key in queries.similar(ingredients, number, ranking):
+            summaries = get_cache().get("find", key)
+            if summaries is None:
+                queries.remove(key)
+                continue
+            record["hit"] = True
+            return summaries[:number]
+        record["hit"] = False
+        return None
+
+
+def find_recipe_summaries(ingredients, number=RECIPE_COUNT, ranking=1):
+    # Answer from the local index when it has enough good matches, then from a near-identical
+    # earlier search, and only then ask Spoonacular
+    names = ingredients
+    ingredients = canonicalize(names)
+    if not ingredients:
+        return []
+    min_used = max(1, math.ceil(len(ingredients) * LOCAL_MIN_USED))
+    with span("index.query", ingredients=len(ingredients)) as record:
+        local = [
+            summary for summary in get_index().query(ingredients, number=number, ranking=ranking)
+            if summary["usedIngredientCount"] >= min_used
+        ]
+        record["matches"] = len(local)
+    if len(local) >= number:
+        return local
+    summaries = similar_cached_summaries(ingredients, number=number, ranking=ranking)
+    if summaries is not None:
+        return summaries
+    summaries = find_by_ingredients(names, number=number, ranking=ranking)
+    get_query_index().add(ingredients_key(ingredients, number, ranking), ingredients, number, ranking)
+    return summaries
+
+
+def get_recipes(recipe_ids):
+    # Compact recipes for the ids, in order, skipping any that failed to load
+    recipes = [Recipe.from_payload(payload) for payload in get_recipes_information(recipe_ids)]
+    get_index().add_many(recipes)
+    return recipes
+
+
+def suggest_recipes(ingredients, number=RECIPE_COUNT, ranking=1):
+    summaries = find_recipe_summaries(ingredients, number=number, ranking=ranking)
+    return get_recipes([summary['id'] for summary in summaries])
+
+
+def get_recipe_details(recipe_id):
+    try:
+        payload = get_recipe_information(recipe_id)
+    except SpoonacularError:
+        return None
+    if not payload:
+        return None
+    recipe = Recipe.from_payload(payload)
+    get_index().add(recipe)
+    return recipe
+
+
+def prefetch_recipe(recipe_id):
+    # Future for one recipe's details; concurrent requests for the same id share it
+    with _prefetch_lock:
+        future = _prefetching.get(recipe_id)
+        if future is None:
+            future = _prefetch_pool.submit(bind(get_recipe_details), recipe_id)
+            _prefetching[recipe_id] = future
+            future.add_done_callback(lambda _: _prefetching.pop(recipe_id, None))
+    return future
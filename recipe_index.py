@@ -0,0 +1,212 @@
+import threading
+
+import numpy as np
+
+from cache import get_cache
+from favorites import get_store
+from ingredients import canonical_ingredient
+from recipe_model import Recipe
+
+# Diet flags of a recipe, packed into one byte per row
+DIETS = {"vegetarian": 1, "vegan": 2, "gluten_free": 4, "dairy_free": 8}
+# Sort name -> (column, descending)
+SORTS = {
+    "health": ("_health", True),
+    "ready": ("_ready", False),
+    "price": ("_price", False),
+}
+
+
+def recipe_ingredients(recipe):
+    names = []
+    for ing in recipe.ingredients:
+        if ing.name:
+            key = canonical_ingredient(ing.name)
+            if key not in names:
+                names.append(key)
+    return names
+
+
+class RecipeIndex:
+    # Each recipe is a row of bits, one per known ingredient. Each query term is a mask of the
+    # ingredients it matches, so used/missed counts for every candidate come from vectorized
+    # ANDs instead of a Python loop over ingredient lists.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vocab = {}
+        self._names = []
+        # Inverted index from a query term to the ingredients it matches: the full name
+        # and its last word, so a query for "tomato" also matches "cherry tomato"
+        self._by_word = {}
+        # Inverted index from ingredient bit to the rows that contain it
+        self._postings = {}
+        self._rows = {}
+        self._recipes = []
+        self._row_bits = []
+        self._bits = np.zeros((0, 1), dtype=np.uint64)
+        self._counts = np.zeros(0, dtype=np.int32)
+        # Facet columns, one entry per row; NaN where Spoonacular gave no value
+        self._diets = np.zeros(0, dtype=np.uint8)
+        self._favorite = np.zeros(0, dtype=bool)
+        self._ready = np.zeros(0, dtype=np.float32)
+        self._health = np.zeros(0, dtype=np.float32)
+        self._price = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self._recipes)
+
+    def _bit(self, name):
+        bit = self._vocab.get(name)
+        if bit is None:
+            bit = len(self._names)
+            self._vocab[name] = bit
+            self._names.append(name)
+            self._by_word.setdefault(name.rsplit(" ", 1)[-1], set()).add(bit)
+            self._by_word.setdefault(name, set()).add(bit)
+        return bit
+
+    def _grow(self, rows, words):
+        capacity, width = self._bits.shape
+        if rows <= capacity and words <= width:
+            return
+        bits = np.zeros((max(rows, capacity * 2, 16), max(words, width)), dtype=np.uint64)
+        bits[:capacity, :width] = self._bits
+        self._bits = bits
+        for name, fill in (("_counts", 0), ("_diets", 0), ("_favorite", False),
+                           ("_ready", np.nan), ("_health", np.nan), ("_price", np.nan)):
+            old = getattr(self, name)
+            column = np.full(bits.shape[0], fill, dtype=old.dtype)
+            column[:len(old)] = old
+            setattr(self, name, column)
+
+    def add(self, recipe, favorite=False):
+        # Adds or updates a recipe; favorite marks it (once marked, it stays a favorite)
+        names = recipe_ingredients(recipe)
+        with self._lock:
+            row = self._rows.get(recipe.id)
+            if row is None:
+                row = len(self._recipes)
+                self._rows[recipe.id] = row
+                self._recipes.append(None)
+                self._row_bits.append([])
+            for bit in self._row_bits[row]:
+                self._postings[bit].discard(row)
+            bits = [self._bit(name) for name in names]
+            self._grow(row + 1, len(self._names) // 64 + 1)
+            self._bits[row] = 0
+            for bit in bits:
+                self._bits[row, bit // 64] |= np.uint64(1 << (bit % 64))
+                self._postings.setdefault(bit, set()).add(row)
+            self._counts[row] = len(bits)
+            self._row_bits[row] = bits
+            self._recipes[row] = {"id": recipe.id, "title": recipe.title, "image": recipe.image}
+            self._diets[row] = sum(flag for diet, flag in DIETS.items() if getattr(recipe, diet))
+            self._favorite[row] |= favorite
+            self._ready[row] = np.nan if recipe.ready_in_minutes is None else recipe.ready_in_minutes
+            self._health[row] = np.nan if recipe.health_score is None else recipe.health_score
+            self._price[row] = np.nan if recipe.price_per_serving is None else recipe.price_per_serving
+
+    def add_many(self, recipes, favorite=False):
+        for recipe in recipes:
+            self.add(recipe, favorite)
+
+    def filter(self, diets=(), max_ready=None, min_health=None, max_price=None, favorites_only=False,
+               sort="health", offset=0, limit=20):
+        # (number of matches, one page of them) for recipes with every diet in diets and within
+        # the given limits, answered from the facet columns alone. Unknown values fail a limit
+        # and sort last
+        with self._lock:
+            rows = len(self._recipes)
+            mask = np.ones(rows, dtype=bool)
+            required = sum(DIETS[diet] for diet in diets)
+            if required:
+                mask &= (self._diets[:rows] & required) == required
+            if max_ready is not None:
+                mask &= self._ready[:rows] <= max_ready
+            if min_health is not None:
+                mask &= self._health[:rows] >= min_health
+            if max_price is not None:
+                mask &= self._price[:rows] <= max_price
+            if favorites_only:
+                mask &= self._favorite[:rows]
+            matches = np.flatnonzero(mask)
+
+            column, descending = SORTS[sort]
+            values = getattr(self, column)[matches]
+            keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+            page = matches[np.argsort(keys, kind="stable")][offset:offset + limit]
+
+            def value(column, row):
+                return None if np.isnan(column[row]) else round(float(column[row]), 2)
+
+            return len(matches), [
+                dict(
+                    self._recipes[row],
+                    readyInMinutes=value(self._ready, row),
+                    healthScore=value(self._health, row),
+                    pricePerServing=value(self._price, row),
+                    favorite=bool(self._favorite[row]),
+                )
+                for row in page
+            ]
+
+    def query(self, ingredients, number=3, ranking=1):
+        # Same shape as findByIngredients results. ranking=1 maximizes used ingredients,
+        # ranking=2 minimizes missing ones
+        with self._lock:
+            # One term can match several ingredients ("oil" -> olive oil, sesame oil), so
+            # each query term gets its own mask and counts once per recipe
+            term_bits = {}
+            for ing in ingredients:
+                bits = self._by_word.get(canonical_ingredient(ing))
+                if bits:
+                    term_bits[canonical_ingredient(ing)] = bits
+            query_bits = set().union(*term_bits.values())
+            candidates = set()
+            for bit in query_bits:
+                candidates |= self._postings.get(bit, set())
+            if not candidates:
+                return []
+
+            masks = np.zeros((len(term_bits), self._bits.shape[1]), dtype=np.uint64)
+            for term, bits in enumerate(term_bits.values()):
+                for bit in bits:
+                    masks[term, bit // 64] |= np.uint64(1 << (bit % 64))
+            rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            matched = (self._bits[rows][:, None, :] & masks[None, :, :]).any(axis=2)
+            used = matched.sum(axis=1, dtype=np.int32)
+            # Two terms can match the same ingredient ("oil", "olive oil")
+            missed = np.maximum(self._counts[rows] - used, 0)
+
+            if ranking == 2:
+                order = np.lexsort((-used, missed))
+            else:
+                order = np.lexsort((missed, -used))
+            results = []
+            for i in order[:number]:
+                row = rows[i]
+                row_bits = self._row_bits[row]
+                results.append(dict(
+                    self._recipes[row],
+                    usedIngredientCount=int(used[i]),
+                    missedIngredientCount=int(missed[i]),
+                    usedIngredients=[{"name": self._names[bit]} for bit in row_bits if bit in query_bits],
+                    missedIngredients=[{"name": self._names[bit]} for bit in row_bits if bit not in query_bits],
+                ))
+            return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    # Built once per process from every recipe already cached or favorited
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RecipeIndex()
+            _index.add_many(Recipe.from_payload(payload) for payload in get_cache().values("recipe"))
+            _index.add_many(get_store().iter_all(), favorite=True)
+        return _index
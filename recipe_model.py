@@ -0,0 +1,96 @@
+from collections import namedtuple
+
+from cache import get_cache
+
+# Bumped whenever the stored record layout changes; older records are re-projected on read.
+# Fields are only ever appended, so an older record is a prefix of the current one
+SCHEMA_VERSION = 2
+
+Ingredient = namedtuple("Ingredient", "name original")
+
+
+class Recipe(namedtuple(
+    "Recipe",
+    "id title image ready_in_minutes servings source_url ingredients instructions"
+    " vegetarian vegan gluten_free dairy_free health_score price_per_serving"
+)):
+    # Only the fields the app renders or filters on. The full Spoonacular payload (nutrition,
+    # wine pairing, analyzedInstructions...) stays in the response cache; see payload()
+    __slots__ = ()
+
+    @classmethod
+    def from_payload(cls, payload):
+        # Projects a Spoonacular /information payload
+        ingredients = tuple(
+            Ingredient(
+                ing.get("nameClean") or ing.get("name") or "",
+                ing.get("originalString") or ing.get("original") or ing.get("name") or "",
+            )
+            for ing in payload.get("extendedIngredients") or []
+        )
+        return cls(
+            payload["id"],
+            payload.get("title") or "",
+            payload.get("image"),
+            payload.get("readyInMinutes"),
+            payload.get("servings"),
+            payload.get("sourceUrl"),
+            ingredients,
+            payload.get("instructions") or "",
+            payload.get("vegetarian"),
+            payload.get("vegan"),
+            payload.get("glutenFree"),
+            payload.get("dairyFree"),
+            payload.get("healthScore"),
+            payload.get("pricePerServing"),
+        )
+
+    @classmethod
+    def from_record(cls, record):
+        # Inverse of to_record; also accepts a full payload, as stored before records were versioned
+        if isinstance(record, dict):
+            return cls.from_payload(record)
+        version, *fields = record
+        if version != SCHEMA_VERSION:
+            # Rebuilt from the cached payload when there is one; otherwise the fields added
+            # since are left unknown, rather than refetching
+            payload = get_cache().get("recipe", str(fields[0]))
+            if payload is not None:
+                return cls.from_payload(payload)
+            fields += [None] * (len(cls._fields) - len(fields))
+        recipe = cls(*fields)
+        return recipe._replace(ingredients=tuple(Ingredient(*ing) for ing in recipe.ingredients))
+
+    def to_record(self):
+        # JSON-ready list: [version, id, title, ..., [[name, original], ...], instructions, ...]
+        return [SCHEMA_VERSION, *self]
+
+    def to_json(self):
+        # Spoonacular-style keys, for API responses
+        return {
+            "id": self.id,
+            "title": self.title,
+            "image": self.image,
+            "readyInMinutes": self.ready_in_minutes,
+            "servings": self.servings,
+            "sourceUrl": self.source_url,
+            "extendedIngredients": [{"name": ing.name, "original": ing.original} for ing in self.ingredients],
+            "instructions": self.instructions,
+            "vegetarian": self.vegetarian,
+            "vegan": self.vegan,
+            "glutenFree": self.gluten_free,
+            "dairyFree": self.dairy_free,
+            "healthScore": self.health_score,
+            "pricePerServing": self.price_per_serving,
+        }
+
+    @staticmethod
+    def load_payload(recipe_id):
+        # Imported here so modules that only store recipes do not load requests
+        from spoonacular import get_recipe_information
+
+        return get_recipe_information(recipe_id)
+
+    def payload(self):
+        # The full Spoonacular payload, from the response cache or refetched
+        return self.load_payload(self.id)
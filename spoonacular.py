@@ -0,0 +1,123 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+from cache import get_cache, ingredients_key
+from ingredients import canonicalize, query_names
+from http_client import get_client
+from telemetry import bind, span
+
+# Load API key
+load_dotenv()
+SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")
+
+BASE_URL = os.getenv("SPOONACULAR_BASE_URL", "https://api.spoonacular.com").rstrip("/")
+# Upper bound on parallel /information calls when the bulk endpoint is unavailable
+MAX_DETAIL_WORKERS = 8
+
+
+class SpoonacularError(Exception):
+    def __init__(self, status_code, text=""):
+        super().__init__(f"Spoonacular API error: {status_code or text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def find_by_ingredients(ingredients, number=3, ranking=1):
+    # Keyed by canonical names in sorted order, so "onion, tomatoes" and "tomato, onion" are
+    # one request; the query itself sends the names as given (see ingredients.query_name)
+    names = query_names(ingredients)
+    ingredients = canonicalize(ingredients)
+    if not ingredients:
+        return []
+    with span("spoonacular.find", number=number, ranking=ranking) as record:
+        record["cache"] = "hit"
+
+        def fetch():
+            record["cache"] = "miss"
+            params = {
+                "apiKey": SPOONACULAR_API_KEY,
+                "ingredients": ",".join(names),
+                "number": number,
+                "ranking": ranking
+            }
+            try:
+                res = get_client().get(f"{BASE_URL}/recipes/findByIngredients", "spoonacular", params=params)
+            except requests.RequestException as e:
+                raise SpoonacularError(None, str(e)) from e
+            if res.status_code != 200:
+                raise SpoonacularError(res.status_code)
+            return res.json()
+
+        # Sessions searching the same ingredients at once share one request
+        return get_cache().get_or_fetch("find", ingredients_key(ingredients, number, ranking), fetch)
+
+
+def get_recipe_information(recipe_id):
+    with span("spoonacular.information", recipe_id=recipe_id) as record:
+        record["cache"] = "hit"
+
+        def fetch():
+            record["cache"] = "miss"
+            url = f"{BASE_URL}/recipes/{recipe_id}/information"
+            params = {
+                "apiKey": SPOONACULAR_API_KEY,
+                # Nutrition is never shown and roughly doubles the payload
+                "includeNutrition": "false"
+            }
+            # Raises SpoonacularError like the bulk fetch, since callers of either can be
+            # handed the other's error when they share an in-flight fetch for an id
+            try:
+                res = get_client().get(url, "spoonacular", params=params)
+            except requests.RequestException as e:
+                raise SpoonacularError(None, str(e)) from e
+            return res.json() if res.status_code == 200 else None
+
+        return get_cache().get_or_fetch("recipe", str(recipe_id), fetch)
+
+
+def get_recipe_information_bulk(recipe_ids):
+    # One round trip for every id not already cached or being fetched by another session;
+    # returns None so the caller can fall back
+    if not recipe_ids:
+        return []
+
+    def fetch(missing):
+        params = {
+            "apiKey": SPOONACULAR_API_KEY,
+            "ids": ",".join(missing),
+            "includeNutrition": "false"
+        }
+        with span("spoonacular.bulk", ids=len(recipe_ids), cached=len(recipe_ids) - len(missing)):
+            try:
+                res = get_client().get(f"{BASE_URL}/recipes/informationBulk", "spoonacular", params=params)
+            except requests.RequestException as e:
+                raise SpoonacularError(None, str(e)) from e
+            if res.status_code != 200:
+                raise SpoonacularError(res.status_code)
+            return {str(recipe["id"]): recipe for recipe in res.json()}
+
+    try:
+        return get_cache().get_many_or_fetch("recipe", [str(recipe_id) for recipe_id in recipe_ids], fetch)
+    except SpoonacularError:
+        return None
+
+
+def _get_recipe_information_safe(recipe_id):
+    try:
+        return get_recipe_information(recipe_id)
+    except SpoonacularError:
+        return None
+
+
+def get_recipes_information(recipe_ids, max_workers=MAX_DETAIL_WORKERS):
+    # Detailed recipes in the order of recipe_ids, skipping any that failed
+    recipe_ids = list(recipe_ids)
+    recipes = get_recipe_information_bulk(recipe_ids)
+    if recipes is None:
+        workers = max(1, min(max_workers, len(recipe_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            recipes = list(pool.map(bind(_get_recipe_information_safe), recipe_ids))
+    return [recipe for recipe in recipes if recipe]
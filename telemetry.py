@@ -0,0 +1,175 @@
+import argparse
+import contextvars
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Structured timing records, one JSON object per line; set to an empty string to disable
+TELEMETRY_PATH = os.getenv("TELEMETRY_PATH", "telemetry.jsonl")
+# Size at which the file is moved to TELEMETRY_PATH + ".1" (replacing the previous one) and
+# a new one started, so a long-lived server keeps at most twice this on disk
+TELEMETRY_MAX_BYTES = int(os.getenv("TELEMETRY_MAX_BYTES", 10 * 1024 * 1024))
+
+_session = contextvars.ContextVar("telemetry_session", default=None)
+_lock = threading.Lock()
+_file = None
+
+
+def _reset_after_fork():
+    # A forked PDF worker must not reuse the parent's lock or file handle
+    global _lock, _file
+    _lock = threading.Lock()
+    _file = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def set_session(session_id):
+    _session.set(session_id)
+
+
+def bind(fn):
+    # Carry the caller's session into a worker thread, which starts with an empty context
+    session = _session.get()
+
+    def bound(*args, **kwargs):
+        token = _session.set(session)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _session.reset(token)
+    return bound
+
+
+def emit(record):
+    global _file
+    if not TELEMETRY_PATH:
+        return
+    line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+    with _lock:
+        if _file is None:
+            _file = open(TELEMETRY_PATH, "a")
+        if _file.tell() + len(line) > TELEMETRY_MAX_BYTES:
+            _file.close()
+            try:
+                os.replace(TELEMETRY_PATH, TELEMETRY_PATH + ".1")
+            except OSError:
+                pass
+            _file = open(TELEMETRY_PATH, "a")
+        _file.write(line)
+        _file.flush()
+
+
+@contextmanager
+def span(stage, **attrs):
+    # Times the block and writes one record; the yielded dict takes extra attributes
+    record = {"ts": round(time.time(), 3), "session": _session.get(), "stage": stage}
+    record.update(attrs)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["ok"] = False
+        record["error"] = type(e).__name__
+        raise
+    else:
+        record.setdefault("ok", True)
+    finally:
+        record["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        emit(record)
+
+
+def read_records(path=TELEMETRY_PATH, max_bytes=None):
+    # With max_bytes, only the records in the last max_bytes of the file
+    records = []
+    if not path or not os.path.exists(path):
+        return records
+    with open(path, "rb") as f:
+        if max_bytes is not None and os.path.getsize(path) > max_bytes:
+            f.seek(-max_bytes, os.SEEK_END)
+            # Skip the partial line the window starts in
+            f.readline()
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+def stage_stats(records):
+    durations = {}
+    errors = {}
+    for record in records:
+        durations.setdefault(record["stage"], []).append(record["ms"])
+        errors[record["stage"]] = errors.get(record["stage"], 0) + (not record.get("ok", True))
+    stats = []
+    for stage in sorted(durations):
+        values = sorted(durations[stage])
+        stats.append({
+            "stage": stage,
+            "count": len(values),
+            "errors": errors[stage],
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+        })
+    return stats
+
+
+def quota_by_session(records):
+    # Spoonacular points per session, from the X-API-Quota-Request header of each response
+    sessions = {}
+    for record in records:
+        if record["stage"] != "http.spoonacular" or "status" not in record:
+            continue
+        session = sessions.setdefault(record.get("session") or "-", {"requests": 0, "points": 0.0, "quota_left": None})
+        session["requests"] += 1
+        # Every call costs at least one point when the header is missing
+        session["points"] += float(record.get("quota_request") or 1)
+        if record.get("quota_left") is not None:
+            session["quota_left"] = record["quota_left"]
+    return sessions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage latency and Spoonacular quota from telemetry records.")
+    parser.add_argument("path", nargs="?", default=TELEMETRY_PATH or "telemetry.jsonl")
+    parser.add_argument("--session", help="only records from this session")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args(argv)
+
+    records = read_records(args.path)
+    if args.session:
+        records = [record for record in records if record.get("session") == args.session]
+    stats = stage_stats(records)
+    quota = quota_by_session(records)
+    if args.json:
+        json.dump({"stages": stats, "quota": quota}, sys.stdout, indent=2)
+        print()
+        return
+
+    print(f"{'stage':<24}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for row in stats:
+        print(f"{row['stage']:<24}{row['count']:>8}{row['errors']:>8}{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}")
+    print()
+    print(f"{'session':<34}{'requests':>10}{'points':>10}{'left':>10}")
+    for session, row in sorted(quota.items()):
+        left = "" if row["quota_left"] is None else f"{row['quota_left']:g}"
+        print(f"{session:<34}{row['requests']:>10}{row['points']:>10.2f}{left:>10}")
+
+
+if __name__ == "__main__":
+    main()
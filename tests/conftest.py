@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Set before any app module is imported, since they read their paths at import time
+_TMP = tempfile.mkdtemp(prefix="recipe-tests-")
+os.environ.update(
+    RECIPE_CACHE_PATH=os.path.join(_TMP, "responses.sqlite"),
+    FAVORITES_PATH=os.path.join(_TMP, "favorites.sqlite"),
+    PDF_CACHE_DIR=os.path.join(_TMP, "pdf"),
+    IMAGE_CACHE_DIR=os.path.join(_TMP, "images"),
+    TELEMETRY_PATH="",
+    SPOONACULAR_API_KEY="test",
+    CLARIFAI_API_KEY="test",
+)
+
+
+def make_recipe(recipe_id, ingredients=(), **fields):
+    from recipe_model import Ingredient, Recipe
+
+    recipe = Recipe(recipe_id, f"Recipe {recipe_id}", None, None, None, None,
+                    tuple(Ingredient(name, name) for name in ingredients), "",
+                    None, None, None, None, None, None)
+    return recipe._replace(**fields)
+
+
+@pytest.fixture
+def fresh_state(tmp_path, monkeypatch):
+    # Empty process-wide cache, indexes and HTTP client for one test
+    import cache
+    import http_client
+    import ingredients
+    import recipe_index
+
+    monkeypatch.setattr(cache, "_cache", cache.ResponseCache(str(tmp_path / "responses.sqlite")))
+    monkeypatch.setattr(http_client, "_client", http_client.HttpClient())
+    monkeypatch.setattr(http_client, "_client_pid", os.getpid())
+    monkeypatch.setattr(ingredients, "_queries", None)
+    monkeypatch.setattr(recipe_index, "_index", recipe_index.RecipeIndex())
+    return tmp_path
+
+
+@pytest.fixture
+def upstream(fresh_state, monkeypatch):
+    # benchmarks/fake_servers.py standing in for Clarifai and Spoonacular
+    import clarifai
+    import spoonacular
+    from benchmarks.fake_servers import start
+
+    fake, server = start(latency_ms=0, jitter_ms=0)
+    monkeypatch.setattr(spoonacular, "BASE_URL", fake.base_url)
+    monkeypatch.setattr(clarifai, "MODEL_URL", f"{fake.base_url}/v2/models/food-item-recognition/outputs")
+    yield fake
+    server.shutdown()
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import api
+
+
+def post_suggest(body, query=""):
+    # (status, body lines) of one /suggest request against a fresh app
+    async def run():
+        async with TestClient(TestServer(api.make_app())) as client:
+            response = await client.post(f"/suggest{query}", json=body)
+            text = await response.text()
+            if response.content_type == "application/x-ndjson":
+                return response.status, [json.loads(line) for line in text.splitlines()]
+            return response.status, [json.loads(text)]
+
+    return asyncio.run(run())
+
+
+def test_suggest_rejects_ingredients_that_are_not_a_list_of_strings(upstream):
+    for body in [{"ingredients": "tomato"}, {"ingredients": [1, 2]}, {"other": []}, ["tomato"]]:
+        status, lines = post_suggest(body)
+        assert status == 400
+        assert lines == [{"error": 'Expected {"ingredients": [...]}'}]
+    assert upstream.requests == 0
+
+
+def test_suggest_fetches_recipes_in_one_bulk_call(upstream):
+    status, lines = post_suggest({"ingredients": ["tomato", "onion"]}, "?number=10")
+    assert status == 200
+    assert [next(iter(line)) for line in lines] == ["ingredients", "summaries"] + ["recipe"] * 10 + ["done"]
+    # findByIngredients, then informationBulk
+    assert upstream.requests == 2
+
+
+def test_suggest_caps_number(upstream):
+    status, lines = post_suggest({"ingredients": ["tomato"]}, f"?number={api.MAX_RECIPE_COUNT + 1}")
+    assert status == 400
+    assert upstream.requests == 0
@@ -0,0 +1,57 @@
+import io
+import json
+
+from PIL import Image
+
+import batch
+
+
+def write_image(path, color):
+    buffered = io.BytesIO()
+    Image.new("RGB", (320, 240), color).save(buffered, format="JPEG")
+    path.write_bytes(buffered.getvalue())
+
+
+def read_lines(path):
+    # Complete lines only, as batch.completed_images reads them
+    lines = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                lines.append(json.loads(line))
+            except ValueError:
+                continue
+    return lines
+
+
+def test_batch_resumes_after_completed_images(tmp_path, upstream):
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    write_image(photos / "a.jpg", (200, 40, 40))
+    write_image(photos / "b.jpg", (40, 200, 40))
+    (photos / "broken.jpg").write_bytes(b"not an image")
+    output = str(tmp_path / "suggestions.jsonl")
+
+    stats = batch.run(str(photos), output, workers=2, number=2)
+    assert stats["processed"] == 3
+    assert stats["failed"] == 1
+    lines = {line["image"]: line for line in read_lines(output)}
+    assert len(lines[str(photos / "a.jpg")]["recipes"]) == 2
+    assert lines[str(photos / "broken.jpg")]["error"]
+
+    # Only the failed image is tried again, even after a run cut off mid-line
+    with open(output, "a") as f:
+        f.write('{"image": "partial')
+    stats = batch.run(str(photos), output, workers=2, number=2)
+    assert stats["processed"] == 1
+    assert read_lines(output)[-1]["image"] == str(photos / "broken.jpg")
+
+
+def test_unexpected_errors_fail_only_that_image(tmp_path, monkeypatch):
+    def malformed(*args, **kwargs):
+        raise KeyError("outputs")
+
+    monkeypatch.setattr(batch, "detect_ingredients", malformed)
+    write_image(tmp_path / "a.jpg", (200, 40, 40))
+    record = batch.process_image(str(tmp_path / "a.jpg"), 2, 1)
+    assert record["error"] == "KeyError: 'outputs'"
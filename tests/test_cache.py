@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.sqlite"))
+
+
+def test_get_many_or_fetch_fetches_only_missing_keys(cache):
+    cache.set("recipe", "1", {"id": 1})
+    calls = []
+
+    def fetch(missing):
+        calls.append(missing)
+        return {key: {"id": int(key)} for key in missing}
+
+    assert cache.get_many_or_fetch("recipe", ["1", "2", "3"], fetch) == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert calls == [["2", "3"]]
+    assert cache.get("recipe", "3") == {"id": 3}
+
+
+def test_concurrent_callers_share_one_fetch(cache):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"value": 42}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_fetch("find", "k", fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("find", "k", fetch)))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == [{"value": 42}] * 5
+    assert cache.stats()["find"]["coalesced"] + cache.stats()["find"]["hits"] == 4
+
+
+def test_fetch_error_reaches_every_waiter(cache):
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_fetch("find", "k", fetch)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert errors == ["upstream down", "upstream down"]
+    # Nothing is cached or left in flight, so the next call fetches again
+    assert cache.get_or_fetch("find", "k", lambda: "ok") == "ok"
+
+
+def test_none_is_returned_but_not_cached(cache):
+    assert cache.get_or_fetch("recipe", "1", lambda: None) is None
+    assert cache.get_or_fetch("recipe", "1", lambda: {"id": 1}) == {"id": 1}
+
+
+def test_memory_layer_stays_within_budget(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), memory_max_bytes=5000)
+    for i in range(20):
+        cache.set("recipe", str(i), {"id": i, "title": "x" * 500})
+    stats = cache.memory_stats()
+    assert stats["bytes"] <= 5000
+    assert stats["evictions"] > 0
+    # Evicted from memory, still on disk
+    assert cache.get("recipe", "0") == {"id": 0, "title": "x" * 500}
+
+
+def test_memory_hits_touch_disk_access_time(cache, monkeypatch):
+    import cache as cache_module
+
+    cache.set("recipe", "1", {"id": 1})
+    cache._conn.execute("UPDATE responses SET accessed = 0")
+    monkeypatch.setattr(cache_module, "ACCESS_WRITE_SECONDS", 0)
+    cache.get("recipe", "1")
+    assert cache._conn.execute("SELECT accessed FROM responses").fetchone()[0] > 0
@@ -0,0 +1,54 @@
+import json
+import os
+
+from conftest import ROOT, make_recipe
+from favorites import FavoritesStore
+from recipe_model import SCHEMA_VERSION, Recipe
+
+LEGACY_FIXTURE = os.path.join(ROOT, "favorites.json")
+
+
+def test_legacy_json_is_imported_once(tmp_path, fresh_state):
+    with open(LEGACY_FIXTURE, "r") as f:
+        legacy = json.load(f)
+    path = str(tmp_path / "favorites.sqlite")
+
+    store = FavoritesStore(path, legacy_path=LEGACY_FIXTURE)
+    assert store.count() == len(legacy)
+    recipe = store.get(legacy[0]["id"])
+    assert recipe.title == legacy[0]["title"]
+    assert [ing.original for ing in recipe.ingredients]
+
+    # A favorite removed after the import is not brought back by reopening
+    store.remove(legacy[0]["id"])
+    assert FavoritesStore(path, legacy_path=LEGACY_FIXTURE).count() == len(legacy) - 1
+
+
+def test_add_many_returns_new_ids(tmp_path, fresh_state):
+    store = FavoritesStore(str(tmp_path / "favorites.sqlite"), legacy_path=None)
+    assert store.add_many([make_recipe(1), make_recipe(2)]) == [1, 2]
+    assert store.add_many([make_recipe(2), make_recipe(3)]) == [3]
+    # Newest first
+    assert [recipe_id for recipe_id, _ in store.titles()] == [3, 1, 2]
+
+
+def test_old_records_are_upgraded_on_open(tmp_path, fresh_state):
+    path = str(tmp_path / "favorites.sqlite")
+    store = FavoritesStore(path, legacy_path=None)
+    # A version 1 record (no diet or price fields) and a full payload from before versioning
+    v1 = [1, 7, "Soup", None, 30, 2, None, [["tomato", "2 tomatoes"]], "Boil."]
+    with open(LEGACY_FIXTURE, "r") as f:
+        payload = json.load(f)[0]
+    store._conn.execute("INSERT INTO favorites VALUES (7, 'Soup', 1, ?)", (json.dumps(v1),))
+    store._conn.execute("INSERT INTO favorites VALUES (?, ?, 2, ?)",
+                        (payload["id"], payload["title"], json.dumps(payload)))
+    store._conn.execute("DELETE FROM meta WHERE key = 'schema'")
+
+    store = FavoritesStore(path, legacy_path=None)
+    rows = store._conn.execute("SELECT payload FROM favorites").fetchall()
+    assert all(json.loads(row[0])[0] == SCHEMA_VERSION for row in rows)
+    soup = store.get(7)
+    assert soup == Recipe.from_record(v1)
+    assert soup.ingredients[0].original == "2 tomatoes"
+    assert soup.vegan is None
+    assert store.get(payload["id"]).title == payload["title"]
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from http_client import CircuitBreaker, QuotaBucket, QuotaExhaustedError
+
+
+def test_breaker_opens_after_threshold_failures():
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.record(False)
+    assert breaker.allow()
+    breaker.record(False)
+    assert not breaker.allow()
+
+
+def test_breaker_lets_a_trial_through_after_cooldown_and_closes_on_success():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    breaker.record(False)
+    assert not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.allow()
+    assert breaker.failures == 0
+
+
+def test_bucket_spends_burst_then_gives_up_after_max_wait():
+    bucket = QuotaBucket(rate=0.001, burst=2, reserve=0)
+    bucket.acquire()
+    bucket.acquire()
+    with pytest.raises(QuotaExhaustedError):
+        bucket.acquire(max_wait=0.01)
+
+
+def test_bucket_keeps_the_reserve():
+    bucket = QuotaBucket(rate=100, burst=10, reserve=5)
+    bucket.update({"X-API-Quota-Left": "5.5", "X-API-Quota-Used": "144.5"})
+    with pytest.raises(QuotaExhaustedError):
+        bucket.acquire()
+
+
+def test_bucket_slows_down_when_quota_runs_low():
+    bucket = QuotaBucket(rate=5, burst=10, reserve=0)
+    bucket.update({"X-API-Quota-Left": "500", "X-API-Quota-Used": "500"})
+    assert bucket.rate == 5
+    bucket.update({"X-API-Quota-Left": "10", "X-API-Quota-Used": "990"})
+    assert bucket.rate < 5
+
+
+def test_bucket_unblocks_after_the_daily_reset():
+    bucket = QuotaBucket(rate=100, burst=10, reserve=5)
+    bucket.update({"X-API-Quota-Left": "4", "X-API-Quota-Used": "146"})
+    with pytest.raises(QuotaExhaustedError):
+        bucket.acquire()
+    bucket.resets_at = time.time() - 1
+    bucket.acquire(max_wait=1)
+    assert bucket.quota_left is None
+    assert bucket.rate == 100
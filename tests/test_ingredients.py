@@ -0,0 +1,61 @@
+from ingredients import QueryIndex, canonicalize, query_names, select_ingredients
+
+
+def test_canonicalize_sorts_dedupes_and_singularizes():
+    assert canonicalize(["Tomatoes", "tomato", " Red  Onions ", "berries"]) == ["berry", "red onion", "tomato"]
+
+
+def test_canonicalize_keeps_names_that_are_not_plurals():
+    names = ["cookies", "octopus", "cactus", "hibiscus", "greens", "asparagus", "watercress", "swiss cheese"]
+    assert canonicalize(names) == sorted(
+        ["cookie", "octopus", "cactus", "hibiscus", "greens", "asparagus", "watercress", "swiss cheese"]
+    )
+
+
+def test_canonicalize_strips_es_only_from_known_plurals():
+    assert canonicalize(["quiches", "brioches", "peaches", "radishes"]) == ["brioche", "peach", "quiche", "radish"]
+
+
+def test_canonicalize_maps_synonyms_and_drops_categories():
+    assert canonicalize(["Aubergines", "spring onion", "food", "vegetable"]) == ["eggplant", "green onion"]
+    assert canonicalize(["food"]) == []
+
+
+def test_query_names_keep_the_plural_but_map_synonyms():
+    assert query_names(["Cookies", "courgettes", "food"]) == ["cookies", "zucchini"]
+
+
+def test_select_ingredients_applies_threshold_and_top_k():
+    concepts = [
+        {"name": "tomato", "value": 0.99},
+        {"name": "tomatoes", "value": 0.98},
+        {"name": "food", "value": 0.97},
+        {"name": "onion", "value": 0.9},
+        {"name": "garlic", "value": 0.5},
+    ]
+    assert select_ingredients(concepts, threshold=0.85) == ["onion", "tomato"]
+    assert select_ingredients(concepts, threshold=0.85, top_k=1) == ["tomato"]
+
+
+def test_select_ingredients_returns_query_names():
+    concepts = [
+        {"name": "Cookies", "value": 0.99},
+        {"name": "cookie", "value": 0.98},
+        {"name": "courgettes", "value": 0.95},
+        {"name": "quiches", "value": 0.9},
+    ]
+    selected = select_ingredients(concepts)
+    assert selected == ["cookies", "quiches", "zucchini"]
+    assert query_names(selected) == selected
+    assert canonicalize(selected) == ["cookie", "quiche", "zucchini"]
+
+
+def test_query_index_finds_similar_searches():
+    queries = QueryIndex()
+    queries.add("a", ["egg", "milk", "flour", "sugar", "butter"], 5, 1)
+    queries.add("b", ["egg", "milk"], 5, 1)
+    queries.add("c", ["egg", "milk", "flour", "sugar", "butter"], 3, 1)
+    assert queries.similar(["egg", "milk", "flour", "sugar"], 5, 1, min_similarity=0.8) == ["a"]
+    assert queries.similar(["egg", "milk", "flour", "sugar"], 5, 2, min_similarity=0.8) == []
+    queries.remove("a")
+    assert queries.similar(["egg", "milk", "flour", "sugar"], 5, 1, min_similarity=0.8) == []
@@ -0,0 +1,47 @@
+import io
+
+from PIL import Image
+
+import pipeline
+from recipe_model import Recipe
+
+
+def make_image(color):
+    buffered = io.BytesIO()
+    Image.new("RGB", (640, 480), color).save(buffered, format="JPEG")
+    return buffered.getvalue()
+
+
+def test_uploads_to_recipes_end_to_end(upstream):
+    prepared = pipeline.prepare_uploads([make_image((200, 40, 40)), make_image((40, 200, 40))])
+    assert all(max(image["size"]) <= 1024 for image in prepared)
+
+    ingredients = pipeline.detect_ingredients(prepared)
+    assert ingredients
+    assert ingredients == sorted(ingredients)
+
+    summaries = pipeline.find_recipe_summaries(ingredients, number=3)
+    assert len(summaries) == 3
+    recipes = pipeline.get_recipes([summary["id"] for summary in summaries])
+    assert [recipe.id for recipe in recipes] == [summary["id"] for summary in summaries]
+    assert all(isinstance(recipe, Recipe) and recipe.ingredients for recipe in recipes)
+
+    # The same uploads again are answered from the caches alone
+    requests_before = upstream.requests
+    assert pipeline.detect_ingredients(pipeline.prepare_uploads([make_image((200, 40, 40)), make_image((40, 200, 40))])) == ingredients
+    assert pipeline.find_recipe_summaries(ingredients, number=3) == summaries
+    assert pipeline.get_recipe_details(recipes[0].id) == recipes[0]
+    assert upstream.requests == requests_before
+
+
+def test_recipe_details_are_prefetched_once(upstream):
+    futures = [pipeline.prefetch_recipe(4242) for _ in range(3)]
+    recipes = [future.result(5) for future in futures]
+    assert recipes[0].id == 4242
+    assert recipes[0] == recipes[1] == recipes[2]
+    assert upstream.requests == 1
+
+
+def test_search_without_real_ingredients_spends_no_request(upstream):
+    assert pipeline.find_recipe_summaries(["food", "vegetable"]) == []
+    assert upstream.requests == 0
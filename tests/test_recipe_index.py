@@ -0,0 +1,88 @@
+import pytest
+
+from conftest import make_recipe
+from recipe_index import RecipeIndex
+
+
+@pytest.fixture
+def index():
+    index = RecipeIndex()
+    index.add(make_recipe(1, ["tomato", "onion", "garlic", "basil", "pasta", "salt"]))
+    index.add(make_recipe(2, ["tomato", "onion"]))
+    index.add(make_recipe(3, ["chicken", "rice"]))
+    return index
+
+
+def test_ranking_1_maximizes_used_ingredients(index):
+    results = index.query(["tomato", "onion", "garlic"], number=3, ranking=1)
+    assert [result["id"] for result in results] == [1, 2]
+    assert results[0]["usedIngredientCount"] == 3
+    assert results[0]["missedIngredientCount"] == 3
+
+
+def test_ranking_2_minimizes_missing_ingredients(index):
+    results = index.query(["tomato", "onion", "garlic"], number=3, ranking=2)
+    assert [result["id"] for result in results] == [2, 1]
+    assert results[0]["missedIngredientCount"] == 0
+
+
+def test_query_matches_plurals_and_last_words(index):
+    index.add(make_recipe(4, ["cherry tomato"]))
+    ids = {result["id"] for result in index.query(["Tomatoes"], number=10)}
+    assert ids == {1, 2, 4}
+
+
+def test_a_term_matching_several_ingredients_counts_once():
+    index = RecipeIndex()
+    index.add(make_recipe(1, ["olive oil", "sesame oil", "vegetable oil", "salt"]))
+    [result] = index.query(["oil", "garlic", "rice", "chicken"])
+    assert result["usedIngredientCount"] == 1
+    assert result["missedIngredientCount"] == 3
+
+
+def test_readding_a_recipe_replaces_its_ingredients(index):
+    index.add(make_recipe(3, ["beef"]))
+    assert index.query(["chicken"]) == []
+    assert [result["id"] for result in index.query(["beef"])] == [3]
+
+
+@pytest.fixture
+def facets():
+    index = RecipeIndex()
+    index.add(make_recipe(1, ["tofu"], vegan=True, vegetarian=True, ready_in_minutes=20, health_score=80))
+    index.add(make_recipe(2, ["cheese"], vegetarian=True, ready_in_minutes=45, health_score=40,
+                          price_per_serving=150))
+    index.add(make_recipe(3, ["beef"], gluten_free=True, ready_in_minutes=90, price_per_serving=400))
+    index.add(make_recipe(4, []), favorite=True)
+    return index
+
+
+def test_filter_by_diet(facets):
+    total, results = facets.filter(diets=["vegetarian"])
+    assert total == 2
+    assert [result["id"] for result in results] == [1, 2]
+    assert facets.filter(diets=["vegetarian", "vegan"])[0] == 1
+
+
+def test_filter_limits_exclude_unknown_values(facets):
+    total, results = facets.filter(max_ready=45, sort="ready")
+    assert [result["id"] for result in results] == [1, 2]
+    assert facets.filter(max_price=200)[0] == 1
+
+
+def test_filter_sorts_unknown_values_last(facets):
+    _, results = facets.filter(sort="health")
+    assert [result["id"] for result in results][:2] == [1, 2]
+    _, results = facets.filter(sort="price")
+    assert [result["id"] for result in results][:2] == [2, 3]
+    assert results[-1]["pricePerServing"] is None
+
+
+def test_filter_favorites_and_paging(facets):
+    facets.add(make_recipe(2, ["cheese"], vegetarian=True, ready_in_minutes=45), favorite=True)
+    total, results = facets.filter(favorites_only=True)
+    assert total == 2
+    assert {result["id"] for result in results} == {2, 4}
+    total, page = facets.filter(sort="ready", offset=1, limit=2)
+    assert total == 4
+    assert [result["id"] for result in page] == [2, 3]
@@ -0,0 +1,71 @@
+import threading
+
+import requests
+
+import pipeline
+import spoonacular
+
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class BlockingClient:
+    # Holds the first request until release is set, then answers it with respond(url)
+    def __init__(self, respond):
+        self.respond = respond
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.urls = []
+
+    def get(self, url, endpoint, **kwargs):
+        self.urls.append(url)
+        self.started.set()
+        self.release.wait(5)
+        return self.respond(url)
+
+
+def run_coalesced(monkeypatch, client, leader, follower):
+    # Starts leader, then follower once the leader's request is in flight; returns both results
+    monkeypatch.setattr(spoonacular, "get_client", lambda: client)
+    results = {}
+    threads = [threading.Thread(target=lambda: results.update(leader=leader()))]
+    threads[0].start()
+    client.started.wait(5)
+    threads.append(threading.Thread(target=lambda: results.update(follower=follower())))
+    threads[1].start()
+    # Give the follower time to find the leader's fetch in flight
+    threading.Event().wait(0.1)
+    client.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_single_lookup_waiting_on_a_failed_bulk_fetch_returns_none(fresh_state, monkeypatch):
+    client = BlockingClient(lambda url: Response(503))
+    results = run_coalesced(
+        monkeypatch, client,
+        leader=lambda: spoonacular.get_recipe_information_bulk([77]),
+        follower=lambda: pipeline.get_recipe_details(77),
+    )
+    assert results == {"leader": None, "follower": None}
+    assert all("informationBulk" in url for url in client.urls)
+
+
+def test_bulk_lookup_waiting_on_a_failed_single_fetch_skips_the_recipe(fresh_state, monkeypatch):
+    def respond(url):
+        raise requests.ConnectionError("connection reset")
+
+    client = BlockingClient(respond)
+    results = run_coalesced(
+        monkeypatch, client,
+        leader=lambda: pipeline.get_recipe_details(77),
+        follower=lambda: spoonacular.get_recipes_information([77]),
+    )
+    assert results == {"leader": None, "follower": []}